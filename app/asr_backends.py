@@ -0,0 +1,78 @@
+# Pluggable speech-recognition backends
+# app/asr_backends.py
+
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Union
+
+import numpy as np
+
+from app.model_registry import model_registry
+from app.web_audio_utils import WHISPER_MODEL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# "whisper" = openai-whisper fp32 via the batching WhisperService,
+# "faster_whisper" = CTranslate2 with int8 weights
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper").lower()
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_THREADS = int(os.getenv("FASTER_WHISPER_THREADS", "0"))  # 0 = CTranslate2 default
+FASTER_WHISPER_WORKERS = int(os.getenv("FASTER_WHISPER_WORKERS", "1"))  # concurrent transcribe() calls
+FASTER_WHISPER_BEAM_SIZE = int(os.getenv("FASTER_WHISPER_BEAM_SIZE", "1"))
+
+def _load_faster_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+                        cpu_threads=FASTER_WHISPER_THREADS, num_workers=FASTER_WHISPER_WORKERS)
+
+def _warm_faster_whisper(model):
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+    list(segments)  # segments are lazy; decoding happens on iteration
+
+model_registry.register("faster_whisper", _load_faster_whisper, _warm_faster_whisper)
+
+class ASRBackend(ABC):
+    """Transcribes float32 mono 16 kHz audio, or an audio file the model decodes itself, to text"""
+
+    name = None
+    model_names = ()  # model_registry entries to warm for this backend
+
+    @abstractmethod
+    def transcribe(self, audio: Union[np.ndarray, str]) -> str:
+        ...
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper, batched across sessions by WhisperService"""
+
+    name = "whisper"
+    model_names = ("whisper",)
+
+    def transcribe(self, audio: Union[np.ndarray, str]) -> str:
+        from app.whisper_service import whisper_service
+        return whisper_service.transcribe(audio)
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper (CTranslate2) with int8 compute on CPU"""
+
+    name = "faster_whisper"
+    model_names = ("faster_whisper",)
+
+    def transcribe(self, audio: Union[np.ndarray, str]) -> str:
+        from app.whisper_service import WHISPER_LANGUAGE
+        segments, _ = model_registry.get("faster_whisper").transcribe(
+            audio, beam_size=FASTER_WHISPER_BEAM_SIZE, language=WHISPER_LANGUAGE)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+ASR_BACKENDS = {backend.name: backend for backend in (WhisperBackend, FasterWhisperBackend)}
+
+_instances: Dict[str, ASRBackend] = {}
+
+def get_asr_backend(name: str = None) -> ASRBackend:
+    """The configured backend (ASR_BACKEND), or a named one"""
+    name = (name or ASR_BACKEND).lower()
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}' (choose from {', '.join(ASR_BACKENDS)})")
+    if name not in _instances:
+        _instances[name] = ASR_BACKENDS[name]()
+    return _instances[name]
@@ -1,21 +1,22 @@
 import sounddevice as sd
-import wavio
-import whisper
 
-model = whisper.load_model("base")
+from app.streaming_asr import VAD_FRAME_MS, transcribe_stream
+from app.asr_backends import get_asr_backend
 
-def record_audio(duration=5, fs=44100, filename="user.wav"):
-    print("Recording...")
-    recording = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='int16')
-    sd.wait()
-    wavio.write(filename, recording, fs, sampwidth=2)
-    print("Recording complete.")
-    return filename
+def transcribe_audio(audio):
+    """Transcribe a WAV path or a float32 16 kHz array"""
+    # Paths go to the model as-is: both backends decode files with their own loaders
+    return get_asr_backend().transcribe(audio)
 
-def transcribe_audio(filename):
-    result = model.transcribe(filename)
-    return result["text"]
+def record_and_transcribe(fs=16000, on_partial=None):
+    """Listen until the speaker stops (VAD) instead of recording a fixed 5 seconds"""
+    blocksize = fs * VAD_FRAME_MS // 1000
+    with sd.InputStream(samplerate=fs, channels=1, dtype='int16', blocksize=blocksize) as stream:
+        def read_chunk():
+            data, _ = stream.read(blocksize)
+            return data[:, 0]
 
-def record_and_transcribe():
-    filename = record_audio()
-    return transcribe_audio(filename)
+        print("Listening...")
+        text = transcribe_stream(read_chunk, fs, on_partial=on_partial or (lambda partial: print(f"… {partial}")))
+    print("Recording complete.")
+    return text
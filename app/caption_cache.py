@@ -0,0 +1,119 @@
+# Perceptual-hash caption cache
+# app/caption_cache.py
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Below this grey-level standard deviation a frame is treated as blank
+CAPTION_CACHE_MIN_CONTRAST = float(os.getenv("CAPTION_CACHE_MIN_CONTRAST", "6"))
+
+def _gray(frame: np.ndarray) -> np.ndarray:
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash of a BGR (or grayscale) frame as a hash_size*hash_size bit integer"""
+    small = cv2.resize(_gray(frame), (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def is_near_blank(frame: np.ndarray, min_contrast: float = None) -> bool:
+    """True for near-uniform frames (lens covered, dark room, blown out).
+
+    Their dHash bits come from sensor noise, so unrelated blank frames land
+    within a few bits of each other and must not share a cache entry.
+    """
+    min_contrast = CAPTION_CACHE_MIN_CONTRAST if min_contrast is None else min_contrast
+    return float(_gray(frame).std()) < min_contrast
+
+def cache_key(frame: np.ndarray) -> Optional[int]:
+    """dHash of the frame, or None when it is too blank to hash reliably"""
+    return None if is_near_blank(frame) else dhash(frame)
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+class CaptionCache:
+    """LRU + TTL cache of captions keyed by session and perceptual hash.
+
+    A lookup matches any stored hash within `threshold` bits, so a user
+    standing still keeps hitting the same entry even though every JPEG
+    they send is byte-for-byte different. Lookups only see entries from
+    the same session, so one user never hears another user's scene. A
+    frame_hash of None (see cache_key) is a blank frame and never cached.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.threshold = threshold if threshold is not None else int(os.getenv("CAPTION_CACHE_HAMMING_THRESHOLD", "5"))
+        self.max_entries = max_entries or int(os.getenv("CAPTION_CACHE_MAX_ENTRIES", "256"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("CAPTION_CACHE_TTL_SECONDS", "30"))
+        self._entries = OrderedDict()  # (session, hash) -> (caption, stored_at)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "blank_frames": 0}
+
+    def _expire(self, now: float):
+        # Entries are kept in insertion/use order, but TTL is measured from
+        # when they were stored, so scan rather than stopping at the first fresh one
+        stale = [key for key, (_, stored_at) in self._entries.items() if now - stored_at > self.ttl_seconds]
+        for key in stale:
+            del self._entries[key]
+        self.stats["expired"] += len(stale)
+
+    def get(self, frame_hash: Optional[int], session: Optional[str] = None):
+        """Return the caption of the session's closest cached frame within threshold, or None"""
+        if frame_hash is None:
+            self.stats["blank_frames"] += 1
+            return None
+        now = time.monotonic()
+        self._expire(now)
+
+        best_key, best_distance = None, self.threshold + 1
+        for key in self._entries:
+            entry_session, h = key
+            if entry_session != session:
+                continue
+            distance = hamming_distance(frame_hash, h)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+                if distance == 0:
+                    break
+
+        if best_key is None:
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(best_key)
+        self.stats["hits"] += 1
+        return self._entries[best_key][0]
+
+    def put(self, frame_hash: Optional[int], caption, session: Optional[str] = None):
+        if frame_hash is None:
+            return
+        key = (session, frame_hash)
+        self._entries[key] = (caption, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0,
+            "threshold": self.threshold,
+        }
+
+# Global cache; entries are partitioned by session
+caption_cache = CaptionCache()
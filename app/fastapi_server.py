@@ -12,6 +12,7 @@ import json
 import time
 import traceback
 import asyncio
+import functools
 import base64
 import numpy as np
 from PIL import Image
@@ -22,7 +23,19 @@ import logging
 
 # AWS Integration
 from app.aws_utils import S3Manager, DynamoDBManager
-from app.vision_utils import detect_frame_caption
+from app.vision_batcher import analyze_frame_batched
+from app.vision_pool import VISION_WORKERS, vision_pool
+from app.vision_quality import quality_controller
+from app.caption_cache import cache_key, caption_cache
+from app.frame_utils import EncodedFrame
+from app.flow_control import FlowController, cpu_load
+from app.frame_quality import FrameRing
+from app.visual_memory import VisualMemory
+from app.question_router import question_router, route_options, NO_VISION, MEMORY, YOLO_ONLY, CAPTION_ONLY, FULL
+from app.scene_change import SceneChangeDetector
+from app.object_tracker import ObjectTracker
+from app.model_registry import model_registry
+from app.vision_utils import VISION_BACKEND, _get_model_executors, analyze_frame_streaming, render_scene_text  # also registers the model loaders
 from app.chat import ask_gpt
 from app.tts_utils import speak_response_aws
 
@@ -40,18 +53,69 @@ app = FastAPI(
 s3_manager = S3Manager()
 dynamodb_manager = DynamoDBManager()
 
+# Track objects across incoming frames (YOLO every TRACK_DETECT_EVERY frames)
+OBJECT_TRACKING = os.getenv("OBJECT_TRACKING", "false").lower() == "true"
+
+# Push BLIP caption tokens to the client as they decode
+STREAM_CAPTIONS = os.getenv("STREAM_CAPTIONS", "false").lower() == "true"
+
+# While a conversation is active, re-analyse the scene in the background every
+# SCENE_REFRESH_INTERVAL_S (0 = off); questions use that state if it is no
+# older than SCENE_FRESHNESS_S, otherwise they wait for a fresh analysis
+SCENE_REFRESH_INTERVAL_S = float(os.getenv("SCENE_REFRESH_INTERVAL_S", "2"))
+SCENE_FRESHNESS_S = float(os.getenv("SCENE_FRESHNESS_S", "5"))
+
+CONVERSATION_TIMEOUT_S = 300  # 5 minutes
+
+# Models that must be warm before /health reports this worker as ready
+# With a vision worker pool the models live in the workers, not this process
+_default_warmup = "" if VISION_WORKERS else ("blip_onnx,yolo_onnx" if VISION_BACKEND == "onnx" else "blip,yolo")
+WARMUP_MODELS = [m.strip() for m in os.getenv("MODEL_WARMUP", _default_warmup).split(",") if m.strip()]
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load and warm models in the background so startup isn't blocked"""
+    model_registry.warm_up_in_background(WARMUP_MODELS)
+    if VISION_WORKERS:
+        vision_pool.start()
+
+@app.on_event("shutdown")
+async def stop_vision_pool():
+    vision_pool.stop()
+
 class ConversationManager:
     def __init__(self):
         self.hotwords = ["hey buddy", "hey body", "a buddy", "hey bud", "hey but"]
         self.last_hotword_time = 0
         self.conversation_active = False
         self.last_activity_time = 0
-        self.current_frame = None
+        self.latest_frame = None  # EncodedFrame, decoded only when analysed
+        self.frame_ring = FrameRing()  # recent frames scored for sharpness/exposure
+        self.scene_detector = SceneChangeDetector()
+        self.object_tracker = ObjectTracker()
+        self._tracking_busy = False
+        self.flow_controllers = {}  # WebSocket -> FlowController, each remembers what it last sent
+        self.visual_memory = VisualMemory()
+        self.scene_state = None
+        self.scene_state_time = 0.0
+        self._scene_lock = asyncio.Lock()
+        self._scene_refresher = None
+        self.scene_state_stats = {"hits": 0, "refreshes": 0, "background_refreshes": 0}
         self.session_id = None
+    
+    @property
+    def current_frame(self):
+        """Pixels of the latest frame, decoded on first access"""
+        return self.latest_frame.pixels if self.latest_frame is not None else None
+    
+    @property
+    def current_frame_tier(self):
+        return self.latest_frame.tier if self.latest_frame is not None else None
         
     def start_session(self):
         """Start a new conversation session"""
         self.session_id = str(uuid.uuid4())
+        self.visual_memory.clear()
         logger.info(f"Started new session: {self.session_id}")
         
         # Log session start in DynamoDB
@@ -97,7 +161,7 @@ class ConversationManager:
         if self.conversation_active:
             time_since_activity = current_time - self.last_activity_time
             
-            if time_since_activity < 300:  # 5 minutes
+            if time_since_activity < CONVERSATION_TIMEOUT_S:
                 if len(text_clean.split()) >= 2:
                     self.last_activity_time = current_time
                     logger.info(f"💭 Question detected: '{text_clean}'")
@@ -111,26 +175,36 @@ class ConversationManager:
         return "NONE", None
     
     def update_frame(self, frame_data):
-        """Update the current video frame and save to S3"""
+        """Update the current video frame and save to S3
+        
+        frame_data is the raw JPEG from a binary WebSocket message, or base64
+        text from a JSON video_frame message. The bytes are kept as-is; pixels
+        are only decoded if the frame is analysed or tracked.
+        """
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(frame_data)
-            image = Image.open(BytesIO(image_data))
-            frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            self.current_frame = frame
+            if isinstance(frame_data, str):
+                image_data = base64.b64decode(frame_data)
+            else:
+                image_data = frame_data
+            if not image_data:
+                raise ValueError("Empty video frame")
+            self.latest_frame = EncodedFrame(image_data)
+            # Scored from a 1/4-scale grayscale decode; full pixels stay lazy
+            self.frame_ring.add(self.latest_frame)
+            
+            # Keep tracked objects current; frames that arrive while the
+            # tracker is still busy are skipped rather than queued
+            if OBJECT_TRACKING and not self._tracking_busy:
+                asyncio.create_task(self.track_frame(self.latest_frame))
             
             # Save frame to S3 if we have a session
             if self.session_id:
                 timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
                 frame_key = f"video-frames/{self.session_id}/{timestamp}.jpg"
                 
-                # Convert frame back to bytes for S3 upload
-                _, buffer = cv2.imencode('.jpg', frame)
-                frame_bytes = buffer.tobytes()
-                
-                # Upload to S3 (async)
+                # Upload the client's JPEG bytes unchanged (async)
                 asyncio.create_task(
-                    s3_manager.upload_file_bytes(frame_bytes, frame_key)
+                    s3_manager.upload_file_bytes(image_data, frame_key)
                 )
                 
                 logger.info(f"📹 Frame updated and saved to S3: {frame_key}")
@@ -140,28 +214,238 @@ class ConversationManager:
             logger.error(f"❌ Error updating frame: {e}")
             return False
     
-    def get_scene_analysis(self):
-        """Get analysis of current frame"""
-        if self.current_frame is None:
-            return "No video frame available"
+    def connect(self, websocket: WebSocket):
+        self.flow_controllers[websocket] = FlowController()
+    
+    def disconnect(self, websocket: WebSocket):
+        """Forget a closed client; the scene refresher stops with the last one"""
+        self.flow_controllers.pop(websocket, None)
+        if not self.flow_controllers:
+            self.stop_scene_refresher()
+    
+    def flow_control_update(self, websocket: WebSocket, force=False):
+        """Capture settings for this client if load or conversation state moved them"""
+        controller = self.flow_controllers.get(websocket)
+        if controller is None:
+            return None
+        backlog = quality_controller.in_flight + (1 if self._tracking_busy else 0)
+        return controller.update(backlog, cpu_load(), self.conversation_is_live(), force=force)
+    
+    async def track_frame(self, encoded_frame):
+        """Decode and advance the object tracker off the event loop"""
+        self._tracking_busy = True
+        try:
+            loop = asyncio.get_event_loop()
+            frame = await loop.run_in_executor(None, lambda: encoded_frame.pixels)
+            if frame is None:
+                raise ValueError("Could not decode video frame")
+            # Same single YOLO thread as the batcher and per-request analysis
+            yolo_executor, _ = _get_model_executors()
+            await loop.run_in_executor(yolo_executor, self.object_tracker.update, frame)
+        except Exception as e:
+            logger.error(f"❌ Object tracking error: {e}")
+        finally:
+            self._tracking_busy = False
+    
+    def conversation_is_live(self):
+        return self.conversation_active and time.time() - self.last_activity_time < CONVERSATION_TIMEOUT_S
+    
+    async def get_fresh_scene(self, websocket: WebSocket = None, max_age_s=None):
+        """Scene analysis no older than max_age_s, re-analysing only if needed
         
+        The background refresher normally keeps this state current, so a
+        question is answered without waiting for YOLO/BLIP.
+        """
+        max_age_s = SCENE_FRESHNESS_S if max_age_s is None else max_age_s
+        if self.scene_state is not None and time.time() - self.scene_state_time <= max_age_s:
+            self.scene_state_stats["hits"] += 1
+            return self.scene_state
+        
+        async with self._scene_lock:
+            # A refresh may have finished while we waited for the lock
+            if self.scene_state is not None and time.time() - self.scene_state_time <= max_age_s:
+                self.scene_state_stats["hits"] += 1
+                return self.scene_state
+            
+            analysis = await self.get_scene_analysis(websocket)
+            self.scene_state_stats["refreshes"] += 1
+            if analysis is not None and "error" not in analysis:
+                self.scene_state = analysis
+                self.scene_state_time = time.time()
+                self.visual_memory.add(analysis, self.scene_state_time)
+            return analysis
+    
+    async def get_partial_scene(self, **options):
+        """Fresh scene state if there is one, otherwise run only the requested model
+        
+        Single-stage results are not cached as scene state, since later
+        questions may need the stage that was skipped.
+        """
+        if self.scene_state is not None and time.time() - self.scene_state_time <= SCENE_FRESHNESS_S:
+            self.scene_state_stats["hits"] += 1
+            return self.scene_state
+        
+        encoded = self.frame_ring.best() or self.latest_frame
+        if encoded is None:
+            return None
         try:
+            frame = encoded.pixels
+            if frame is None:
+                raise ValueError("Could not decode video frame")
+            # Through the quality controller like full analyses, so it sees this load too
+            return await self._run_vision(frame, **options)
+        except Exception as e:
+            logger.error(f"❌ Vision analysis error: {e}")
+            return {"error": str(e)}
+    
+    def start_scene_refresher(self):
+        """Keep scene state current in the background while the conversation lasts"""
+        if SCENE_REFRESH_INTERVAL_S <= 0:
+            return
+        if self._scene_refresher is None or self._scene_refresher.done():
+            self._scene_refresher = asyncio.create_task(self._refresh_scene_state())
+    
+    def stop_scene_refresher(self):
+        if self._scene_refresher is not None:
+            self._scene_refresher.cancel()
+            self._scene_refresher = None
+    
+    async def _refresh_scene_state(self):
+        logger.info("🔄 Background scene refresh started")
+        try:
+            while self.conversation_is_live():
+                if self.latest_frame is not None:
+                    # Unchanged scenes reuse the last analysis, so this is cheap when nothing moves
+                    await self.get_fresh_scene(max_age_s=SCENE_REFRESH_INTERVAL_S / 2)
+                    self.scene_state_stats["background_refreshes"] += 1
+                await asyncio.sleep(SCENE_REFRESH_INTERVAL_S)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Background scene refresh error: {e}")
+        logger.info("🔄 Background scene refresh stopped")
+    
+    def get_scene_state_stats(self):
+        age = round(time.time() - self.scene_state_time, 1) if self.scene_state is not None else None
+        return {**self.scene_state_stats, "age_s": age,
+                "refresher_running": self._scene_refresher is not None and not self._scene_refresher.done()}
+    
+    async def get_scene_analysis(self, websocket: WebSocket = None):
+        """Get structured analysis of current frame (None if there is no frame)
+
+        With STREAM_CAPTIONS enabled and a websocket given, caption tokens are
+        pushed to the client as caption_partial messages while BLIP decodes.
+        """
+        if self.latest_frame is None:
+            return None
+        
+        try:
+            # Analyse the sharpest recent frame rather than whatever came last
+            encoded = self.frame_ring.best() or self.latest_frame
+            frame = encoded.pixels
+            if frame is None:
+                raise ValueError("Could not decode video frame")
+            
+            # Skip the models entirely while the view hasn't changed, unless
+            # the last answer came from a lower quality tier than we serve now
+            if (not self.scene_detector.has_changed(frame)
+                    and quality_controller.satisfies(self.scene_detector.last_analysis)):
+                analysis = self.scene_detector.reuse()
+                logger.info(f"♻️ Scene unchanged, reusing last analysis: {analysis['caption']}")
+                return analysis
+            
+            # None for near-blank frames, which the cache never matches
+            frame_hash = cache_key(frame)
+            cached = caption_cache.get(frame_hash, self.session_id)
+            if cached is not None:
+                logger.info(f"♻️ Reusing cached scene analysis: {cached['caption']}")
+                self.scene_detector.mark_analyzed(frame, cached)
+                return cached
+            
             logger.info("🖼️ Analyzing current frame...")
-            analysis = detect_frame_caption(self.current_frame)
+            analysis = await self._run_vision(frame, websocket)
+            # Only full-quality results are worth serving to later requests
+            if analysis["quality_tier"] == "full":
+                caption_cache.put(frame_hash, analysis, self.session_id)
+            self.scene_detector.mark_analyzed(frame, analysis)
             
             # Log analysis result
             if self.session_id:
                 dynamodb_manager.log_session_event(
                     session_id=self.session_id,
                     event_type="vision_analysis",
-                    data={"analysis": analysis}
+                    data={"vision": analysis}
                 )
             
-            logger.info(f"🔍 Scene analysis result: {analysis}")
+            logger.info(f"🔍 Scene analysis result: {analysis['caption']} {analysis['objects']}")
             return analysis
         except Exception as e:
             logger.error(f"❌ Vision analysis error: {e}")
-            return f"Error analyzing video frame: {str(e)}"
+            return {"error": str(e)}
+    
+    async def _run_vision(self, frame, websocket: WebSocket = None, **route_options):
+        """Run the models at the quality tier the current load allows
+        
+        route_options (see route_options()) narrow the run to the stage a
+        routed question needs, on top of the tier's options.
+        """
+        tier = quality_controller.acquire()
+        start = time.perf_counter()
+        try:
+            frame = quality_controller.prepare_frame(frame, tier)
+            options = {**quality_controller.inference_options(tier), **route_options}
+            if not options.get("with_caption", True) and not options.get("with_objects", True):
+                # A caption-only question still needs BLIP at the YOLO-only tier
+                del options["with_caption"]
+            
+            if VISION_WORKERS:
+                # Inference in a worker process; the event loop stays free
+                analysis = await vision_pool.submit(frame, **options)
+            elif STREAM_CAPTIONS and websocket is not None and tier["with_caption"] and not route_options:
+                analysis = await stream_scene_analysis(frame, websocket, **options)
+            else:
+                # Shares a YOLO/BLIP batch with frames from other sessions
+                analysis = await analyze_frame_batched(frame, **options)
+        finally:
+            quality_controller.release(tier, (time.perf_counter() - start) * 1000)
+        
+        analysis["quality_tier"] = tier["name"]
+        return analysis
+
+async def stream_scene_analysis(frame, websocket: WebSocket, **options):
+    """Run analyze_frame_streaming off the event loop, forwarding partial captions"""
+    loop = asyncio.get_event_loop()
+    partials = asyncio.Queue()
+    
+    def on_partial(text):
+        loop.call_soon_threadsafe(partials.put_nowait, text)
+    
+    async def send_partial(text):
+        await websocket.send_text(json.dumps({"type": "caption_partial", "text": text}))
+    
+    inference = loop.run_in_executor(None, functools.partial(analyze_frame_streaming, frame, on_partial, **options))
+    while True:
+        next_partial = asyncio.ensure_future(partials.get())
+        done, _ = await asyncio.wait({next_partial, inference}, return_when=asyncio.FIRST_COMPLETED)
+        if next_partial in done:
+            await send_partial(next_partial.result())
+        else:
+            next_partial.cancel()
+            break
+    
+    # Partials queued just before the caption finished
+    while not partials.empty():
+        await send_partial(partials.get_nowait())
+    
+    analysis = await inference
+    ttft_ms = analysis["timings_ms"]["blip_first_token"]
+    logger.info(f"⏱️ Caption time-to-first-token: {ttft_ms}ms (full caption {analysis['timings_ms']['blip']}ms)")
+    await websocket.send_text(json.dumps({
+        "type": "caption_complete",
+        "caption": analysis["caption"],
+        "time_to_first_token_ms": ttft_ms
+    }))
+    return analysis
 
 # Global conversation manager
 conversation = ConversationManager()
@@ -184,17 +468,28 @@ async def root():
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    conversation.connect(websocket)
     logger.info("🔌 WebSocket connected")
     
     try:
+        # Tell the client how to capture before the first frame arrives
+        await send_flow_control(websocket, force=True)
+        
         while True:
             try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-                message = json.loads(data)
+                received = await asyncio.wait_for(websocket.receive(), timeout=30.0)
+                if received["type"] == "websocket.disconnect":
+                    break
+                if received.get("bytes") is not None:
+                    # Binary messages are raw JPEG video frames
+                    message = {"type": "video_frame", "data": received["bytes"]}
+                else:
+                    message = json.loads(received["text"])
                 
             except asyncio.TimeoutError:
                 try:
                     await websocket.send_text(json.dumps({"type": "ping"}))
+                    await send_flow_control(websocket)
                     continue
                 except:
                     break
@@ -209,6 +504,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     frame_data = message.get("data")
                     if frame_data:
                         success = conversation.update_frame(frame_data)
+                        await send_flow_control(websocket)
                         
                 elif message["type"] == "speech_result":
                     text = message.get("text", "")
@@ -221,6 +517,10 @@ async def websocket_endpoint(websocket: WebSocket):
                                 "message": content,
                                 "session_id": conversation.session_id
                             }))
+                            # Conversation started: ask for frames at the active rate
+                            # and start keeping the scene analysed ahead of questions
+                            await send_flow_control(websocket)
+                            conversation.start_scene_refresher()
                             
                         elif action_type == "QUESTION":
                             await process_question_with_vision(content, websocket)
@@ -246,21 +546,49 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"🔌 WebSocket error: {e}")
     finally:
+        conversation.disconnect(websocket)
         logger.info("🔌 WebSocket connection closed")
 
+async def send_flow_control(websocket: WebSocket, force=False):
+    """Send a flow_control message if the client's capture settings should change"""
+    settings = conversation.flow_control_update(websocket, force=force)
+    if settings:
+        await websocket.send_text(json.dumps(settings))
+
 async def process_question_with_vision(question: str, websocket: WebSocket):
     """Process question with current video frame using AWS services"""
+    started_at = time.perf_counter()
     try:
-        logger.info(f"❓ Processing question with vision: '{question}'")
+        # Only run the stages this question needs
+        route = question_router.route(question)
+        logger.info(f"❓ Processing question with vision: '{question}' ({route})")
         
         # Send processing status
         await websocket.send_text(json.dumps({
             "type": "processing",
-            "message": "Analyzing video and processing your question..."
+            "message": "Processing your question..." if route == NO_VISION else "Analyzing video and processing your question..."
         }))
         
-        # Get scene analysis
-        scene_description = conversation.get_scene_analysis()
+        scene_analysis = None
+        scene_description = ""
+        if route == MEMORY:
+            # Answer from what this session has already seen; no new inference
+            scene_analysis = conversation.scene_state
+            scene_description = conversation.visual_memory.describe(question)
+            if scene_analysis is not None:
+                scene_description += " Right now: " + render_scene_text(scene_analysis)
+        elif route == YOLO_ONLY and OBJECT_TRACKING and conversation.object_tracker.tracks:
+            # The tracker already knows what is in view
+            scene_description = conversation.object_tracker.describe()
+        elif route in (YOLO_ONLY, CAPTION_ONLY):
+            scene_analysis = await conversation.get_partial_scene(**route_options(route))
+            scene_description = render_scene_text(scene_analysis)
+        elif route == FULL:
+            # Use the background-maintained scene state if it is fresh enough
+            scene_analysis = await conversation.get_fresh_scene(websocket)
+            scene_description = render_scene_text(scene_analysis)
+            if OBJECT_TRACKING:
+                scene_description += " " + conversation.object_tracker.describe()
         
         # Build GPT conversation
         messages = [
@@ -276,6 +604,7 @@ async def process_question_with_vision(question: str, websocket: WebSocket):
             {
                 "role": "user", 
                 "content": f"Question: {question}\n\nWhat I can see in the video: {scene_description}"
+                if scene_description else f"Question: {question}"
             }
         ]
         
@@ -283,10 +612,12 @@ async def process_question_with_vision(question: str, websocket: WebSocket):
         try:
             answer = ask_gpt(messages)
             if not answer or answer.strip() == "":
-                answer = f"I can see: {scene_description}. But I'm having trouble generating a specific response to your question."
+                answer = (f"I can see: {scene_description}. But I'm having trouble generating a specific response to your question."
+                          if scene_description else "I'm having trouble generating a response right now.")
         except Exception as gpt_error:
             logger.error(f"❌ GPT Error: {gpt_error}")
-            answer = f"Based on what I can see: {scene_description}. I'm having some technical difficulties right now."
+            answer = (f"Based on what I can see: {scene_description}. I'm having some technical difficulties right now."
+                      if scene_description else "I'm having some technical difficulties right now.")
         
         # Log the Q&A interaction
         if conversation.session_id:
@@ -320,11 +651,14 @@ async def process_question_with_vision(question: str, websocket: WebSocket):
             "question": question,
             "answer": answer,
             "scene_description": scene_description,
+            "quality_tier": (scene_analysis or {}).get("quality_tier"),
+            "route": route,
             "audio_url": audio_url,
             "session_id": conversation.session_id
         }
         
         await websocket.send_text(json.dumps(response_data))
+        question_router.record(route, started_at)
         logger.info(f"✅ Response sent successfully")
         
     except Exception as e:
@@ -365,15 +699,32 @@ async def health_check():
         s3_status = s3_manager.test_connection()
         dynamodb_status = dynamodb_manager.test_connection()
         
-        return {
-            "status": "healthy",
+        models_ready = model_registry.is_ready(WARMUP_MODELS) and (not VISION_WORKERS or vision_pool.is_ready())
+        # A worker the pool gave up on won't come back by waiting
+        pool_failed = bool(VISION_WORKERS) and vision_pool.has_failed()
+        
+        body = {
+            "status": "unhealthy" if pool_failed else "healthy" if models_ready else "warming",
             "aws_services": {
                 "s3": "connected" if s3_status else "disconnected",
                 "dynamodb": "connected" if dynamodb_status else "disconnected"
             },
+            "models": model_registry.status(),
+            "vision_pool": vision_pool.get_stats() if VISION_WORKERS else None,
             "conversation_active": conversation.conversation_active,
-            "session_id": conversation.session_id
+            "session_id": conversation.session_id,
+            "caption_cache": caption_cache.get_stats(),
+            "scene_change": conversation.scene_detector.get_stats(),
+            "vision_quality": quality_controller.get_stats(),
+            "flow_control": [controller.get_stats() for controller in list(conversation.flow_controllers.values())],
+            "scene_state": conversation.get_scene_state_stats(),
+            "frame_quality": conversation.frame_ring.get_stats(),
+            "visual_memory": conversation.visual_memory.get_stats(),
+            "question_routes": question_router.get_stats(),
+            "object_tracking": conversation.object_tracker.get_stats() if OBJECT_TRACKING else None
         }
+        # 503 keeps the load balancer from routing here until models are warm
+        return JSONResponse(body, status_code=200 if models_ready else 503)
     except Exception as e:
         return {
             "status": "unhealthy",
@@ -0,0 +1,87 @@
+# Server-driven frame rate / resolution flow control for /ws clients
+# app/flow_control.py
+
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Capture settings while waiting for the hotword vs. during a conversation
+FLOW_IDLE_FPS = float(os.getenv("FLOW_IDLE_FPS", "0.2"))
+FLOW_ACTIVE_FPS = float(os.getenv("FLOW_ACTIVE_FPS", "2"))
+FLOW_IDLE_MAX_DIM = int(os.getenv("FLOW_IDLE_MAX_DIM", "480"))
+FLOW_ACTIVE_MAX_DIM = int(os.getenv("FLOW_ACTIVE_MAX_DIM", "640"))
+FLOW_IDLE_JPEG_QUALITY = float(os.getenv("FLOW_IDLE_JPEG_QUALITY", "0.6"))
+FLOW_ACTIVE_JPEG_QUALITY = float(os.getenv("FLOW_ACTIVE_JPEG_QUALITY", "0.8"))
+
+# Pressure thresholds: vision requests in flight, and 1-minute load average per core
+FLOW_BACKLOG_HIGH = int(os.getenv("FLOW_BACKLOG_HIGH", "2"))
+FLOW_CPU_HIGH = float(os.getenv("FLOW_CPU_HIGH", "0.85"))
+
+MIN_MAX_DIM = 240
+MIN_JPEG_QUALITY = 0.4
+
+def cpu_load() -> float:
+    """1-minute load average per core (0.0 where the platform has none)"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+class FlowController:
+    """Chooses the capture settings a client should send frames at.
+
+    The base settings depend on whether a conversation is active; each
+    pressure level (backlog or CPU over its threshold, then over twice it)
+    halves the frame rate and trims resolution and JPEG quality. update()
+    only returns settings when they differ from the last ones sent.
+    """
+
+    def __init__(self, backlog_high: int = None, cpu_high: float = None):
+        self.backlog_high = backlog_high or FLOW_BACKLOG_HIGH
+        self.cpu_high = cpu_high or FLOW_CPU_HIGH
+        self.current: Optional[dict] = None
+        self.stats = {"updates_sent": 0, "max_pressure_seen": 0}
+
+    def pressure(self, backlog: int, cpu: float) -> int:
+        if backlog >= 2 * self.backlog_high or cpu >= 2 * self.cpu_high:
+            return 2
+        if backlog >= self.backlog_high or cpu >= self.cpu_high:
+            return 1
+        return 0
+
+    def compute(self, backlog: int, cpu: float, conversation_active: bool) -> dict:
+        if conversation_active:
+            fps, max_dim, quality = FLOW_ACTIVE_FPS, FLOW_ACTIVE_MAX_DIM, FLOW_ACTIVE_JPEG_QUALITY
+        else:
+            fps, max_dim, quality = FLOW_IDLE_FPS, FLOW_IDLE_MAX_DIM, FLOW_IDLE_JPEG_QUALITY
+
+        level = self.pressure(backlog, cpu)
+        return {
+            "type": "flow_control",
+            "target_fps": round(fps / (2 ** level), 3),
+            "max_dimension": max(MIN_MAX_DIM, int(max_dim * (1 - 0.25 * level))),
+            "jpeg_quality": round(max(MIN_JPEG_QUALITY, quality - 0.1 * level), 2),
+            "reason": f"{'active' if conversation_active else 'idle'}, pressure {level}",
+        }
+
+    def update(self, backlog: int, cpu: float, conversation_active: bool, force: bool = False) -> Optional[dict]:
+        """New settings to send to the client, or None if nothing changed"""
+        settings = self.compute(backlog, cpu, conversation_active)
+        self.stats["max_pressure_seen"] = max(self.stats["max_pressure_seen"], self.pressure(backlog, cpu))
+
+        unchanged = self.current is not None and all(
+            settings[key] == self.current[key] for key in ("target_fps", "max_dimension", "jpeg_quality"))
+        if unchanged and not force:
+            return None
+
+        if not unchanged:
+            logger.info(f"Flow control -> {settings['target_fps']}fps, {settings['max_dimension']}px, "
+                        f"q{settings['jpeg_quality']} ({settings['reason']})")
+        self.current = settings
+        self.stats["updates_sent"] += 1
+        return settings
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "current": self.current}
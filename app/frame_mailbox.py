@@ -0,0 +1,71 @@
+# Latest-frame-wins mailbox between frame ingest and vision analysis
+# app/frame_mailbox.py
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Frames older than this when the analyzer gets to them are counted as stale (0 = never)
+FRAME_MAX_AGE_MS = float(os.getenv("FRAME_MAX_AGE_MS", "2000"))
+
+class FrameMailbox:
+    """Single-slot mailbox for one session's frames.
+
+    put() never waits: a new frame overwrites one the analyzer hasn't taken
+    yet (counted as superseded), so however fast the client sends, the
+    analyzer is at most one frame behind. get() waits for the next frame.
+    A frame that went stale while the analyzer was busy is still the newest
+    one the client has sent, so it is analysed rather than dropped (a low-fps
+    client would otherwise get nothing) and counted as stale.
+    """
+
+    def __init__(self, max_age_ms: float = None):
+        self.max_age_ms = max_age_ms if max_age_ms is not None else FRAME_MAX_AGE_MS
+        self._item: Optional[Any] = None
+        self._received_at = 0.0
+        self._event = asyncio.Event()
+        self._closed = False
+        self.stats = {"received": 0, "superseded": 0, "dropped": 0, "stale": 0, "processed": 0}
+
+    def put(self, item: Any):
+        if self._closed:
+            return
+        if self._item is not None:
+            self.stats["superseded"] += 1
+        self._item = item
+        self._received_at = time.monotonic()
+        self.stats["received"] += 1
+        self._event.set()
+
+    async def get(self) -> Optional[Any]:
+        """Wait for the freshest frame; returns None once the mailbox is closed"""
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            if self._closed:
+                return None
+            item, self._item = self._item, None
+            if item is None:
+                continue
+
+            age_ms = (time.monotonic() - self._received_at) * 1000
+            if self.max_age_ms and age_ms > self.max_age_ms:
+                self.stats["stale"] += 1
+                logger.debug(f"Analysing stale frame ({age_ms:.0f}ms old), no newer one has arrived")
+
+            self.stats["processed"] += 1
+            return item
+
+    def close(self):
+        if self._item is not None:
+            self.stats["dropped"] += 1
+            self._item = None
+        self._closed = True
+        self._event.set()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "pending": self._item is not None}
@@ -0,0 +1,82 @@
+# Cheap sharpness/exposure scoring to pick the best recent frame
+# app/frame_quality.py
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_RING_SIZE = int(os.getenv("FRAME_RING_SIZE", "5"))
+# Older frames are not considered, however sharp - the answer should be about now
+FRAME_RING_MAX_AGE_S = float(os.getenv("FRAME_RING_MAX_AGE_S", "2"))
+
+def quality_score(gray: np.ndarray) -> dict:
+    """Sharpness (variance of the Laplacian) weighted by how well exposed the frame is"""
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    mean = float(gray.mean())
+    clipped = float(np.count_nonzero((gray <= 5) | (gray >= 250))) / gray.size
+    exposure = max(0.0, 1.0 - abs(mean - 128.0) / 128.0) * (1.0 - clipped)
+    return {
+        "sharpness": round(sharpness, 1),
+        "exposure": round(exposure, 3),
+        "score": sharpness * exposure,
+    }
+
+def score_jpeg(image_bytes) -> Optional[dict]:
+    """Score compressed bytes from a 1/4-scale grayscale decode (no full decode needed)"""
+    gray = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return quality_score(gray)
+
+class FrameRing:
+    """The last few frames of a session with their quality scores.
+
+    best() returns the highest-scoring recent frame, so a motion-blurred or
+    badly exposed latest frame doesn't get sent to YOLO/BLIP when a sharp
+    one arrived a moment earlier.
+    """
+
+    def __init__(self, size: int = None, max_age_s: float = None):
+        self.max_age_s = max_age_s if max_age_s is not None else FRAME_RING_MAX_AGE_S
+        self._frames = deque(maxlen=size or FRAME_RING_SIZE)  # (frame, quality, received_at)
+        self.stats = {"frames_scored": 0, "unreadable": 0, "picked_latest": 0, "picked_earlier": 0}
+
+    def add(self, frame, image_bytes=None) -> Optional[dict]:
+        """Score and keep a frame; image_bytes defaults to frame.data (an EncodedFrame)"""
+        quality = score_jpeg(image_bytes if image_bytes is not None else frame.data)
+        if quality is None:
+            self.stats["unreadable"] += 1
+            return None
+        self._frames.append((frame, quality, time.monotonic()))
+        self.stats["frames_scored"] += 1
+        return quality
+
+    def best(self):
+        """Sharpest, best-exposed frame still within max_age_s (None if there is none)"""
+        now = time.monotonic()
+        recent = [entry for entry in self._frames if now - entry[2] <= self.max_age_s]
+        if not recent:
+            return None
+
+        best = max(recent, key=lambda entry: entry[1]["score"])
+        if best is recent[-1]:
+            self.stats["picked_latest"] += 1
+        else:
+            self.stats["picked_earlier"] += 1
+            logger.info(f"Using an earlier, sharper frame (score {best[1]['score']:.0f} "
+                        f"vs latest {recent[-1][1]['score']:.0f})")
+        return best[0]
+
+    def clear(self):
+        self._frames.clear()
+
+    def get_stats(self) -> dict:
+        latest = self._frames[-1][1] if self._frames else None
+        return {**self.stats, "size": len(self._frames), "latest_quality": latest}
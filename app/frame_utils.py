@@ -0,0 +1,99 @@
+# Frame decoding helpers for the vision path
+# app/frame_utils.py
+
+import os
+import time
+import logging
+from io import BytesIO
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Resolution tiers map to libjpeg's DCT-domain downscaling, so a reduced
+# tier is decoded at that size directly instead of decoded full and resized
+RESOLUTION_TIERS = {
+    "full": (1, cv2.IMREAD_COLOR),
+    "half": (2, cv2.IMREAD_REDUCED_COLOR_2),
+    "quarter": (4, cv2.IMREAD_REDUCED_COLOR_4),
+    "eighth": (8, cv2.IMREAD_REDUCED_COLOR_8),
+}
+
+# "auto" picks the smallest tier whose longest side still covers the target;
+# YOLO letterboxes to 640 and BLIP resizes to 384, so 640 loses nothing
+VISION_RESOLUTION_TIER = os.getenv("VISION_RESOLUTION_TIER", "auto").lower()
+VISION_TARGET_DIM = int(os.getenv("VISION_TARGET_DIM", "640"))
+
+def jpeg_size(image_bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the image header without decoding pixels"""
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception:
+        return None
+
+def select_tier(size: Optional[Tuple[int, int]], tier: str = None, target_dim: int = None) -> str:
+    tier = tier or VISION_RESOLUTION_TIER
+    if tier != "auto":
+        return tier if tier in RESOLUTION_TIERS else "full"
+    if size is None:
+        return "full"
+
+    target_dim = target_dim or VISION_TARGET_DIM
+    longest = max(size)
+    best = "full"
+    for name, (factor, _) in RESOLUTION_TIERS.items():
+        if longest // factor >= target_dim:
+            best = name
+    return best
+
+def decode_frame(image_bytes, tier: str = None, target_dim: int = None) -> Tuple[Optional[np.ndarray], str]:
+    """Decode JPEG/PNG bytes to a BGR array at the selected resolution tier.
+
+    Returns (frame, tier_used); frame is None if the bytes can't be decoded.
+    """
+    tier = select_tier(jpeg_size(image_bytes), tier, target_dim)
+    _, flag = RESOLUTION_TIERS[tier]
+    # np.frombuffer wraps the bytes without copying them
+    frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), flag)
+    return frame, tier
+
+class EncodedFrame:
+    """A video frame kept as the client's compressed bytes, decoded only on demand.
+
+    Most frames are never analysed, so ingest just wraps the buffer; the
+    pixel array is decoded (at the resolution tier) the first time
+    .pixels is read and then cached for every model that needs it.
+    """
+
+    __slots__ = ("data", "received_at", "_pixels", "_tier")
+
+    def __init__(self, data: bytes, received_at: float = None):
+        self.data = data  # original JPEG bytes, uploaded to S3 as-is
+        self.received_at = received_at if received_at is not None else time.time()
+        self._pixels = None
+        self._tier = None
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self.data)
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._pixels is not None
+
+    @property
+    def pixels(self) -> Optional[np.ndarray]:
+        if self._pixels is None:
+            self._pixels, self._tier = decode_frame(self.data)
+        return self._pixels
+
+    @property
+    def tier(self) -> Optional[str]:
+        return self._tier
+
+    def __len__(self):
+        return len(self.data)
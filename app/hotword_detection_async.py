@@ -1,15 +1,18 @@
 import asyncio
 import json
 import numpy as np
-from vosk import Model, KaldiRecognizer
 from fastapi import WebSocket
 import io
 import wave
 
+from app.vosk_models import get_recognizer_pool
+
 class HotwordDetector:
     def __init__(self, model_path="vosk_model", sample_rate=16000):
-        self.model = Model(model_path)
-        self.recognizer = KaldiRecognizer(self.model, sample_rate)
+        # The Vosk model is loaded once per process; each detector only
+        # borrows a recognizer (decoder state) from the shared pool
+        self._pool = get_recognizer_pool(model_path, sample_rate)
+        self.recognizer = self._pool.acquire()
         self.sample_rate = sample_rate
         self.is_listening = True
         self.hotword_detected = False
@@ -17,6 +20,8 @@ class HotwordDetector:
         
     async def process_audio_chunk(self, audio_data: bytes, websocket: WebSocket):
         """Process incoming audio chunk for hotword detection"""
+        if self.recognizer is None:
+            return
         try:
             # Add audio data to buffer
             self.audio_buffer.extend(audio_data)
@@ -71,8 +76,11 @@ class HotwordDetector:
         self.hotword_detected = False
         
     def stop(self):
-        """Stop the hotword detector"""
+        """Stop the hotword detector and return its recognizer to the pool"""
         self.is_listening = False
+        if self.recognizer is not None:
+            self._pool.release(self.recognizer)
+            self.recognizer = None
         
     def reset_buffer(self):
         """Reset audio buffer"""
@@ -1,60 +1,59 @@
-from vosk import Model, KaldiRecognizer
 import pyaudio
 import json
-from tts_utils import speak_response
-import wave
+from app.tts_utils import speak_response
+from app.streaming_asr import transcribe_stream
+from app.vosk_models import get_recognizer_pool
 
 def wait_for_hotword_and_record():
-    model = Model("vosk_model")
-    rec = KaldiRecognizer(model, 16000)
-
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8192)
-    stream.start_stream()
-
-    print("🔊 Listening for 'hey buddy'...")
-
-    # Hotword detection
-    while True:
-        data = stream.read(4096, exception_on_overflow=False)
-        if rec.AcceptWaveform(data):
-            result = json.loads(rec.Result())
-            text = result.get("text", "").lower()
-            if "hey buddy" in text:
-                print("🟢 Wake word detected!")
-                break
-
-    stream.stop_stream()
-    stream.close()
-
-    # Respond "Yes, how can I help?"
-    speak_response("Yes, how can I help?")
-
-    # Now record the question
-    print("🎙️ Listening for your question...")
-
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8192)
-    stream.start_stream()
-
-    frames = []
-    seconds = 5  # Adjust duration if you want
-    for _ in range(0, int(16000 / 8192 * seconds)):
-        data = stream.read(4096, exception_on_overflow=False)
-        frames.append(data)
-
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-    # Save to WAV
-    wav_path = "question.wav"
-    wf = wave.open(wav_path, 'wb')
-    wf.setnchannels(1)
-    wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-    wf.setframerate(16000)
-    wf.writeframes(b''.join(frames))
-    wf.close()
-
-    # Transcribe
-    from audio_utils import transcribe_audio
-    return transcribe_audio(wav_path)
+    # Shared, loaded-once model; only the recognizer is per call
+    pool = get_recognizer_pool("vosk_model", 16000)
+    rec = p = None
+    try:
+        rec = pool.acquire()
+        p = pyaudio.PyAudio()
+        stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8192)
+        stream.start_stream()
+
+        print("🔊 Listening for 'hey buddy'...")
+
+        # Hotword detection
+        while True:
+            data = stream.read(4096, exception_on_overflow=False)
+            if rec.AcceptWaveform(data):
+                result = json.loads(rec.Result())
+                text = result.get("text", "").lower()
+                if "hey buddy" in text:
+                    print("🟢 Wake word detected!")
+                    break
+
+        stream.stop_stream()
+        stream.close()
+        # Not needed for the question; free it for other listeners now
+        pool.release(rec)
+        rec = None
+
+        # Respond "Yes, how can I help?"
+        speak_response("Yes, how can I help?")
+
+        # Now record the question
+        print("🎙️ Listening for your question...")
+
+        stream = p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8192)
+        stream.start_stream()
+
+        # Stop when the user stops talking rather than after a fixed 5 seconds;
+        # finished phrases are transcribed while they keep speaking
+        def read_chunk():
+            return stream.read(480, exception_on_overflow=False)  # 30 ms
+
+        try:
+            return transcribe_stream(read_chunk, 16000, on_partial=lambda partial: print(f"… {partial}"))
+        finally:
+            stream.stop_stream()
+            stream.close()
+    finally:
+        # Runs however we leave: PyAudio or open() failing, Ctrl-C, or normally
+        if rec is not None:
+            pool.release(rec)
+        if p is not None:
+            p.terminate()
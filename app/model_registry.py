@@ -0,0 +1,105 @@
+# Lazy model registry with background warm-up
+# app/model_registry.py
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+class _ModelEntry:
+    def __init__(self, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]]):
+        self.loader = loader
+        self.warmup = warmup
+        self.model = None
+        self.state = NOT_LOADED
+        self.error = None
+        self.load_time_s = None
+        self.warmup_time_s = None
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """Loads each model on first use (or on an explicit warm-up) exactly once.
+
+    Modules register a loader plus an optional warm-up callable that runs a
+    dummy inference, so the first real request doesn't pay for lazy kernel
+    initialisation either.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        if name not in self._entries:
+            self._entries[name] = _ModelEntry(loader, warmup)
+
+    def get(self, name: str) -> Any:
+        """Return the loaded model, loading (and warming) it on first use"""
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.model
+
+        with entry.lock:
+            if entry.state != READY:
+                self._load(name, entry)
+        return entry.model
+
+    def _load(self, name: str, entry: _ModelEntry):
+        try:
+            entry.state = LOADING
+            start = time.perf_counter()
+            entry.model = entry.loader()
+            entry.load_time_s = round(time.perf_counter() - start, 2)
+            logger.info(f"Model '{name}' loaded in {entry.load_time_s}s")
+
+            if entry.warmup is not None:
+                entry.state = WARMING
+                start = time.perf_counter()
+                entry.warmup(entry.model)
+                entry.warmup_time_s = round(time.perf_counter() - start, 2)
+                logger.info(f"Model '{name}' warmed up in {entry.warmup_time_s}s")
+
+            entry.state = READY
+            entry.error = None
+        except Exception as e:
+            entry.state = FAILED
+            entry.error = str(e)
+            logger.error(f"Failed to load model '{name}': {e}")
+            raise
+
+    def warm_up(self, names: Iterable[str]):
+        """Load and warm the given models, logging (not raising) failures"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def warm_up_in_background(self, names: Iterable[str]) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, args=(list(names),), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self, names: Iterable[str]) -> bool:
+        return all(name in self._entries and self._entries[name].state == READY for name in names)
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "state": entry.state,
+                "load_time_s": entry.load_time_s,
+                "warmup_time_s": entry.warmup_time_s,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+# Global registry shared by vision_utils, audio_utils and web_audio_utils
+model_registry = ModelRegistry()
@@ -0,0 +1,171 @@
+# Detect-every-N-frames object tracking between YOLO runs
+# app/object_tracker.py
+
+import os
+import time
+import logging
+import itertools
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.scene_change import SceneChangeDetector
+
+logger = logging.getLogger(__name__)
+
+TRACK_DETECT_EVERY = int(os.getenv("TRACK_DETECT_EVERY", "5"))
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+TRACK_MAX_MISSES = int(os.getenv("TRACK_MAX_MISSES", "2"))
+
+def iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class Track:
+    def __init__(self, track_id: int, label: str, box, confidence: int):
+        self.track_id = track_id
+        self.label = label
+        self.box = np.array(box, dtype=np.float32)
+        self.confidence = confidence
+        self.velocity = np.zeros(2, dtype=np.float32)  # (dx, dy) per frame
+        self.misses = 0
+        self.first_seen = self.last_seen = time.time()
+
+    def to_dict(self, frame_width: int = None) -> dict:
+        result = {
+            "id": self.track_id,
+            "label": self.label,
+            "box": [int(v) for v in self.box],
+            "confidence": self.confidence,
+        }
+        if frame_width:
+            center_x = (self.box[0] + self.box[2]) / 2
+            result["position"] = "left" if center_x < frame_width / 3 else "right" if center_x > 2 * frame_width / 3 else "center"
+        return result
+
+class ObjectTracker:
+    """Per-session object state with stable track IDs.
+
+    YOLO runs every `detect_every` frames, or as soon as the scene changes;
+    frames in between move each box by the median Lucas-Kanade optical flow
+    of the corners inside it (falling back to the track's last velocity).
+    """
+
+    def __init__(self, detect_fn: Callable = None, detect_every: int = None,
+                 iou_threshold: float = None, max_misses: int = None):
+        self._detect_fn = detect_fn
+        self.detect_every = detect_every or TRACK_DETECT_EVERY
+        self.iou_threshold = iou_threshold if iou_threshold is not None else TRACK_IOU_THRESHOLD
+        self.max_misses = max_misses if max_misses is not None else TRACK_MAX_MISSES
+        self.tracks: List[Track] = []
+        self.scene_detector = SceneChangeDetector()
+        self._ids = itertools.count(1)
+        self._prev_gray: Optional[np.ndarray] = None
+        self._frames_since_detect = 0
+        self.frame_width = None
+        self.stats = {"frames": 0, "detections_run": 0, "frames_tracked": 0}
+
+    def _get_detect_fn(self):
+        if self._detect_fn is None:
+            from app.vision_utils import detect_objects
+            self._detect_fn = detect_objects
+        return self._detect_fn
+
+    def update(self, frame: np.ndarray) -> List[dict]:
+        """Advance the tracker by one BGR frame and return the current tracks"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.frame_width = frame.shape[1]
+        self.stats["frames"] += 1
+
+        needs_detection = (
+            self._prev_gray is None
+            or self._frames_since_detect + 1 >= self.detect_every
+            or self.scene_detector.has_changed(gray)
+        )
+        if needs_detection:
+            detections = self._get_detect_fn()(frame)
+            self._associate(detections)
+            self.scene_detector.mark_analyzed(gray, detections)
+            self._frames_since_detect = 0
+            self.stats["detections_run"] += 1
+        else:
+            self._propagate(self._prev_gray, gray)
+            self._frames_since_detect += 1
+            self.stats["frames_tracked"] += 1
+
+        self._prev_gray = gray
+        return self.current_objects()
+
+    def _associate(self, detections: List[dict]):
+        # Greedy IoU matching, highest overlap first, labels must agree
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, detection in enumerate(detections):
+                if detection["label"] == track.label:
+                    overlap = iou(track.box, detection["box"])
+                    if overlap >= self.iou_threshold:
+                        pairs.append((overlap, ti, di))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_detections = set(), set()
+        for _, ti, di in pairs:
+            if ti in matched_tracks or di in matched_detections:
+                continue
+            track, detection = self.tracks[ti], detections[di]
+            track.box = np.array(detection["box"], dtype=np.float32)
+            track.confidence = detection["confidence"]
+            track.misses = 0
+            track.last_seen = time.time()
+            matched_tracks.add(ti)
+            matched_detections.add(di)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for di, detection in enumerate(detections):
+            if di not in matched_detections:
+                self.tracks.append(Track(next(self._ids), detection["label"], detection["box"], detection["confidence"]))
+
+    def _propagate(self, prev_gray: np.ndarray, gray: np.ndarray):
+        for track in self.tracks:
+            x1, y1, x2, y2 = [int(v) for v in track.box]
+            x1, y1 = max(0, x1), max(0, y1)
+            mask = np.zeros_like(prev_gray)
+            mask[y1:max(y1 + 1, y2), x1:max(x1 + 1, x2)] = 255
+            points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=20, qualityLevel=0.01, minDistance=5, mask=mask)
+
+            shift = track.velocity
+            if points is not None:
+                moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None)
+                good = status.ravel() == 1
+                if good.any():
+                    shift = np.median((moved[good] - points[good]).reshape(-1, 2), axis=0)
+                    track.velocity = shift.astype(np.float32)
+
+            track.box += np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+
+    def current_objects(self) -> List[dict]:
+        return [t.to_dict(self.frame_width) for t in self.tracks]
+
+    def summary(self) -> Dict[str, int]:
+        counts = {}
+        for track in self.tracks:
+            counts[track.label] = counts.get(track.label, 0) + 1
+        return counts
+
+    def describe(self) -> str:
+        """Plain-text "what is around me" from tracked state, no inference"""
+        if not self.tracks:
+            return "No objects currently tracked."
+        parts = [f"{o['label']} #{o['id']} ({o['position']})" if "position" in o else f"{o['label']} #{o['id']}"
+                 for o in self.current_objects()]
+        return "Tracked objects: " + ", ".join(parts) + "."
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "active_tracks": len(self.tracks)}
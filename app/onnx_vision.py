@@ -0,0 +1,324 @@
+# Quantized ONNX Runtime CPU backend for BLIP captioning and YOLO detection
+# app/onnx_vision.py
+#
+# One-shot export + int8 dynamic quantization:
+#   python -m app.onnx_vision export --out models/onnx
+# Parity check against the torch captions:
+#   python -m app.onnx_vision parity temp.jpg other.jpg
+
+import os
+import sys
+import json
+import argparse
+import logging
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/onnx")
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = let ORT decide
+
+BLIP_VISION_FILE = "blip_vision_encoder.int8.onnx"
+BLIP_DECODER_FILE = "blip_text_decoder.int8.onnx"
+BLIP_DECODER_PAST_FILE = "blip_text_decoder_with_past.int8.onnx"
+YOLO_FILE = "yolov8n.int8.onnx"
+YOLO_NAMES_FILE = "yolov8n_names.json"
+
+def _create_session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_INTRA_OP_THREADS:
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+class OnnxBlipCaptioner:
+    """Greedy BLIP captioning over exported vision-encoder and KV-cached text-decoder graphs.
+
+    Greedy decoding matches what blip_model.generate() does with the default
+    generation config (num_beams=1, max_length=20).
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, max_length: int = 20):
+        from transformers import BlipProcessor
+
+        with open(os.path.join(model_dir, "blip_config.json")) as f:
+            config = json.load(f)
+        self.processor = BlipProcessor.from_pretrained(config["processor"])
+        self.bos_token_id = config["bos_token_id"]
+        self.eos_token_id = config["sep_token_id"]
+        self.pad_token_id = config["pad_token_id"]
+        self.num_layers = config["num_layers"]
+        self.max_length = max_length
+
+        self.vision = _create_session(os.path.join(model_dir, BLIP_VISION_FILE))
+        self.decoder = _create_session(os.path.join(model_dir, BLIP_DECODER_FILE))
+        self.decoder_with_past = _create_session(os.path.join(model_dir, BLIP_DECODER_PAST_FILE))
+        self._past_names = [f"past_{i}" for i in range(2 * self.num_layers)]
+
+    def caption_images(self, images, max_new_tokens: int = None) -> List[str]:
+        """Caption a list of RGB PIL images in one encoder pass and one decode loop"""
+        pixel_values = self.processor(images=images, return_tensors="np")["pixel_values"].astype(np.float32)
+        image_embeds = self.vision.run(None, {"pixel_values": pixel_values})[0]
+
+        batch = pixel_values.shape[0]
+        max_new_tokens = max_new_tokens or (self.max_length - 1)
+        input_ids = np.full((batch, 1), self.bos_token_id, dtype=np.int64)
+        generated = [[] for _ in range(batch)]
+        finished = np.zeros(batch, dtype=bool)
+
+        outputs = self.decoder.run(None, {"input_ids": input_ids, "encoder_hidden_states": image_embeds})
+        for _ in range(max_new_tokens):
+            logits, past = outputs[0], outputs[1:]
+            next_tokens = np.where(finished, self.pad_token_id, logits.argmax(axis=-1))
+            for i, token in enumerate(next_tokens):
+                if not finished[i]:
+                    generated[i].append(int(token))
+            finished |= next_tokens == self.eos_token_id
+            if finished.all():
+                break
+
+            feeds = {"input_ids": next_tokens.reshape(batch, 1).astype(np.int64),
+                     "encoder_hidden_states": image_embeds}
+            feeds.update(zip(self._past_names, past))
+            outputs = self.decoder_with_past.run(None, feeds)
+
+        return self.processor.batch_decode(generated, skip_special_tokens=True)
+
+class OnnxYoloDetector:
+    """YOLOv8 detection on the exported int8 graph with letterbox pre- and NMS post-processing"""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, conf_threshold: float = 0.25, iou_threshold: float = 0.7):
+        self.session = _create_session(os.path.join(model_dir, YOLO_FILE))
+        self.input_name = self.session.get_inputs()[0].name
+        self.imgsz = self.session.get_inputs()[0].shape[2]
+        with open(os.path.join(model_dir, YOLO_NAMES_FILE)) as f:
+            self.names = {int(k): v for k, v in json.load(f).items()}
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+    def _letterbox(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        return blob, scale, pad_x, pad_y
+
+    def detect(self, frame) -> List[Tuple[str, float, List[float]]]:
+        """Return [(label, confidence, [x1, y1, x2, y2])] in original frame coordinates"""
+        blob, scale, pad_x, pad_y = self._letterbox(frame)
+        preds = self.session.run(None, {self.input_name: blob})[0][0].T  # (anchors, 4 + classes)
+
+        class_scores = preds[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = confidences > self.conf_threshold
+        if not keep.any():
+            return []
+
+        boxes_cxcywh, class_ids, confidences = preds[keep, :4], class_ids[keep], confidences[keep]
+        boxes = np.empty_like(boxes_cxcywh)
+        boxes[:, 0] = (boxes_cxcywh[:, 0] - boxes_cxcywh[:, 2] / 2 - pad_x) / scale
+        boxes[:, 1] = (boxes_cxcywh[:, 1] - boxes_cxcywh[:, 3] / 2 - pad_y) / scale
+        boxes[:, 2] = boxes_cxcywh[:, 2] / scale
+        boxes[:, 3] = boxes_cxcywh[:, 3] / scale
+
+        # Class-aware NMS, same as ultralytics' default (agnostic=False)
+        detections = []
+        for class_id in np.unique(class_ids):
+            idx = np.where(class_ids == class_id)[0]
+            kept = cv2.dnn.NMSBoxes(boxes[idx].tolist(), confidences[idx].tolist(), self.conf_threshold, self.iou_threshold)
+            for k in np.array(kept).flatten():
+                x, y, bw, bh = boxes[idx[k]]
+                detections.append((self.names[int(class_id)], float(confidences[idx[k]]), [float(x), float(y), float(x + bw), float(y + bh)]))
+        return detections
+
+# ---------------------------------------------------------------------------
+# Export / quantization
+# ---------------------------------------------------------------------------
+
+def _quantize(src: str, dst: str, conv_graph: bool = False):
+    """Dynamic int8 quantization that the CPU execution provider can load.
+
+    Quantized Conv becomes ConvInteger, which ORT's CPU provider only
+    implements for uint8 weights. Transformer graphs therefore quantize just
+    MatMul/Gemm, with int8 weights (BLIP's one patch-embedding Conv stays
+    fp32). The all-conv YOLO graph uses uint8 weights throughout.
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    if conv_graph:
+        quantize_dynamic(src, dst, weight_type=QuantType.QUInt8)
+    else:
+        quantize_dynamic(src, dst, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "Gemm"])
+    os.remove(src)
+    logger.info(f"Quantized {dst}")
+
+def export_blip(out_dir: str, model_name: str = "Salesforce/blip-image-captioning-base"):
+    import torch
+    from transformers import BlipForConditionalGeneration
+
+    model = BlipForConditionalGeneration.from_pretrained(model_name).eval()
+    text_config = model.config.text_config
+    num_layers = text_config.num_hidden_layers
+
+    class VisionEncoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.vision_model = model.vision_model
+
+        def forward(self, pixel_values):
+            return self.vision_model(pixel_values=pixel_values)[0]
+
+    class TextDecoder(torch.nn.Module):
+        # Only self-attention keys/values are cached; BLIP recomputes cross-attention each step
+        def __init__(self):
+            super().__init__()
+            self.text_decoder = model.text_decoder
+
+        def forward(self, input_ids, encoder_hidden_states, *past):
+            past_key_values = tuple((past[2 * i], past[2 * i + 1]) for i in range(num_layers)) if past else None
+            out = self.text_decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+                                    past_key_values=past_key_values, use_cache=True, return_dict=True)
+            presents = [t for layer in out.past_key_values for t in layer]
+            return (out.logits[:, -1, :], *presents)
+
+    image_size = model.config.vision_config.image_size
+    pixel_values = torch.randn(1, 3, image_size, image_size)
+    with torch.no_grad():
+        image_embeds = VisionEncoder()(pixel_values)
+
+    tmp = os.path.join(out_dir, "blip_vision_encoder.onnx")
+    torch.onnx.export(VisionEncoder(), (pixel_values,), tmp, opset_version=14,
+                      input_names=["pixel_values"], output_names=["image_embeds"],
+                      dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}})
+    _quantize(tmp, os.path.join(out_dir, BLIP_VISION_FILE))
+
+    decoder = TextDecoder()
+    input_ids = torch.tensor([[text_config.bos_token_id]], dtype=torch.long)
+    present_names = [f"present_{i}" for i in range(2 * num_layers)]
+    past_names = [f"past_{i}" for i in range(2 * num_layers)]
+    kv_axes = {0: "batch", 2: "past_sequence"}
+
+    tmp = os.path.join(out_dir, "blip_text_decoder.onnx")
+    torch.onnx.export(decoder, (input_ids, image_embeds), tmp, opset_version=14,
+                      input_names=["input_ids", "encoder_hidden_states"],
+                      output_names=["logits"] + present_names,
+                      dynamic_axes={"input_ids": {0: "batch"}, "encoder_hidden_states": {0: "batch"},
+                                    "logits": {0: "batch"}, **{n: kv_axes for n in present_names}})
+    _quantize(tmp, os.path.join(out_dir, BLIP_DECODER_FILE))
+
+    with torch.no_grad():
+        past = decoder(input_ids, image_embeds)[1:]
+    tmp = os.path.join(out_dir, "blip_text_decoder_with_past.onnx")
+    torch.onnx.export(decoder, (input_ids, image_embeds, *past), tmp, opset_version=14,
+                      input_names=["input_ids", "encoder_hidden_states"] + past_names,
+                      output_names=["logits"] + present_names,
+                      dynamic_axes={"input_ids": {0: "batch"}, "encoder_hidden_states": {0: "batch"},
+                                    "logits": {0: "batch"},
+                                    **{n: kv_axes for n in past_names + present_names}})
+    _quantize(tmp, os.path.join(out_dir, BLIP_DECODER_PAST_FILE))
+
+    with open(os.path.join(out_dir, "blip_config.json"), "w") as f:
+        json.dump({
+            "processor": model_name,
+            "bos_token_id": text_config.bos_token_id,
+            "sep_token_id": text_config.sep_token_id,
+            "pad_token_id": text_config.pad_token_id,
+            "num_layers": num_layers,
+        }, f, indent=2)
+
+def export_yolo(out_dir: str, weights: str = "yolov8n.pt"):
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    exported = model.export(format="onnx", imgsz=640, opset=14, simplify=True)
+    tmp = os.path.join(out_dir, "yolov8n.onnx")
+    os.replace(exported, tmp)
+    _quantize(tmp, os.path.join(out_dir, YOLO_FILE), conv_graph=True)
+
+    with open(os.path.join(out_dir, YOLO_NAMES_FILE), "w") as f:
+        json.dump({str(k): v for k, v in model.names.items()}, f, indent=2)
+
+# ---------------------------------------------------------------------------
+# Parity check
+# ---------------------------------------------------------------------------
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def _token_jaccard(a: str, b: str) -> float:
+    return _jaccard(set(a.lower().split()), set(b.lower().split()))
+
+def parity_check(image_paths: List[str], model_dir: str = ONNX_MODEL_DIR) -> dict:
+    """Compare torch and ONNX captions/objects on the given images"""
+    from PIL import Image
+    from app.vision_utils import _run_blip, _run_yolo
+
+    captioner = OnnxBlipCaptioner(model_dir)
+    detector = OnnxYoloDetector(model_dir)
+
+    rows = []
+    for path in image_paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            logger.warning(f"Skipping unreadable image: {path}")
+            continue
+        torch_caption, _ = _run_blip(frame, backend="torch")
+        torch_detections, _ = _run_yolo(frame, backend="torch")
+        torch_objects = [d["label"] for d in torch_detections]
+        onnx_caption = captioner.caption_images([Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))])[0]
+        onnx_objects = sorted(set(label for label, _, _ in detector.detect(frame)))
+
+        rows.append({
+            "image": path,
+            "torch_caption": torch_caption,
+            "onnx_caption": onnx_caption,
+            "caption_exact": torch_caption == onnx_caption,
+            "caption_token_jaccard": round(_token_jaccard(torch_caption, onnx_caption), 3),
+            "objects_jaccard": round(_jaccard(set(torch_objects), set(onnx_objects)), 3),
+        })
+
+    count = len(rows) or 1
+    return {
+        "images": rows,
+        "caption_exact_rate": round(sum(r["caption_exact"] for r in rows) / count, 3),
+        "mean_caption_token_jaccard": round(sum(r["caption_token_jaccard"] for r in rows) / count, 3),
+        "mean_objects_jaccard": round(sum(r["objects_jaccard"] for r in rows) / count, 3),
+    }
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export, quantize and check the ONNX vision backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Export BLIP + YOLOv8n to int8 ONNX")
+    export_parser.add_argument("--out", default=ONNX_MODEL_DIR)
+
+    parity_parser = sub.add_parser("parity", help="Compare ONNX output with the torch models")
+    parity_parser.add_argument("images", nargs="+")
+    parity_parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parity_parser.add_argument("--min-token-jaccard", type=float, default=0.8)
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        os.makedirs(args.out, exist_ok=True)
+        export_blip(args.out)
+        export_yolo(args.out)
+        print(f"ONNX models written to {args.out}")
+        return 0
+
+    report = parity_check(args.images, args.model_dir)
+    print(json.dumps(report, indent=2))
+    return 0 if report["mean_caption_token_jaccard"] >= args.min_token_jaccard else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
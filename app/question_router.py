@@ -0,0 +1,114 @@
+# Rule-based routing of questions to the pipeline stages they actually need
+# app/question_router.py
+
+import re
+import time
+import logging
+from collections import deque
+
+import numpy as np
+
+from app.visual_memory import is_history_question
+
+logger = logging.getLogger(__name__)
+
+# Routes, cheapest first
+NO_VISION = "no_vision"        # small talk: GPT (+ TTS) only
+MEMORY = "memory"              # about the past: answered from visual memory
+YOLO_ONLY = "yolo_only"        # counts / presence of known objects
+CAPTION_ONLY = "caption_only"  # descriptions, colours, activities
+FULL = "full"                  # YOLO + BLIP
+ROUTES = [NO_VISION, MEMORY, YOLO_ONLY, CAPTION_ONLY, FULL]
+
+# YOLOv8 (COCO) class names, plus the plurals/synonyms people use for them
+YOLO_LABELS = {
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+    "people", "persons", "anyone", "anybody", "someone", "somebody", "man", "men", "woman",
+    "women", "kid", "kids", "child", "children", "phone", "table", "sofa", "fridge", "bike",
+    "cars", "dogs", "cats", "chairs", "cups", "bottles", "books",
+}
+_LABEL_PATTERN = re.compile(r"\b(" + "|".join(sorted((re.escape(l) for l in YOLO_LABELS), key=len, reverse=True)) + r")\b")
+
+SMALL_TALK_PATTERN = re.compile(
+    r"^(thanks?( you)?( so much| very much)?|thank you|cheers|ok(ay)?|great|cool|nice|perfect|"
+    r"got it|never ?mind|hello|hi|hey|good (morning|afternoon|evening|night)|bye|goodbye|"
+    r"see you( later)?|how are you( doing)?|whats your name|who are you|what can you do|"
+    r"what time is it|whats the time|tell me a joke)( buddy)?$"
+)
+# Acknowledgements may trail off ("thanks a lot", "ok then buddy") as long
+# as no question follows them ("ok how many cups are there")
+ACK_PATTERN = re.compile(
+    r"^(thanks?|thank you|thx|cheers|ok(ay)?|alright|great|cool|nice|perfect|awesome|got it)"
+    r"(?!.*\b(what|whats|how|where|who|which|why|when|is|are|can|could|do|does|did|see|tell|describe|read|find|count)\b)"
+    r"( \w+){0,4}$"
+)
+COUNT_PATTERN = re.compile(r"\b(how many|count|number of|is there|are there|any|do you see|can you see|is anyone|is anybody|is someone)\b")
+CAPTION_PATTERN = re.compile(
+    r"\b(describe|description|look like|looks like|what colou?r|wearing|doing|happening|going on|"
+    r"what kind of|what sort of|what type of|mood|weather|scene|surroundings|what is this|whats this)\b"
+)
+
+def route_question(question: str) -> str:
+    """Pick the cheapest route that can still answer the question"""
+    text = re.sub(r"[^\w\s]", "", question.lower()).strip()
+    if not text or SMALL_TALK_PATTERN.match(text) or ACK_PATTERN.match(text):
+        return NO_VISION
+    if is_history_question(text):
+        return MEMORY
+    mentions_label = bool(_LABEL_PATTERN.search(text))
+    wants_caption = bool(CAPTION_PATTERN.search(text))
+    if COUNT_PATTERN.search(text) and mentions_label and not wants_caption:
+        return YOLO_ONLY
+    if wants_caption and not COUNT_PATTERN.search(text):
+        return CAPTION_ONLY
+    return FULL
+
+def route_options(route: str) -> dict:
+    """analyze_frame options for a single-stage vision route"""
+    if route == YOLO_ONLY:
+        return {"with_caption": False}
+    if route == CAPTION_ONLY:
+        return {"with_objects": False}
+    return {}
+
+class QuestionRouter:
+    """route_question plus per-route hit counts and end-to-end latency"""
+
+    def __init__(self, window: int = 200):
+        self.hits = {route: 0 for route in ROUTES}
+        self._latencies = {route: deque(maxlen=window) for route in ROUTES}
+
+    def route(self, question: str) -> str:
+        route = route_question(question)
+        self.hits[route] += 1
+        logger.info(f"🧭 Routed '{question}' -> {route}")
+        return route
+
+    def record(self, route: str, started_at: float):
+        """Record a question's latency from a time.perf_counter() start"""
+        self._latencies[route].append((time.perf_counter() - started_at) * 1000)
+
+    def get_stats(self) -> dict:
+        total = sum(self.hits.values())
+        stats = {}
+        for route in ROUTES:
+            samples = np.array(self._latencies[route]) if self._latencies[route] else None
+            stats[route] = {
+                "hits": self.hits[route],
+                "hit_rate": round(self.hits[route] / total, 3) if total else 0.0,
+                "p50_ms": round(float(np.percentile(samples, 50))) if samples is not None else None,
+                "p90_ms": round(float(np.percentile(samples, 90))) if samples is not None else None,
+            }
+        return stats
+
+# Global router: stats are aggregated over all sessions
+question_router = QuestionRouter()
@@ -0,0 +1,70 @@
+# Cheap per-session scene-change detection that gates vision inference
+# app/scene_change.py
+
+import os
+import logging
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCENE_MAD_THRESHOLD = float(os.getenv("SCENE_MAD_THRESHOLD", "12.0"))
+SCENE_HIST_THRESHOLD = float(os.getenv("SCENE_HIST_THRESHOLD", "0.25"))
+
+def thumbnail(frame: np.ndarray, size=(64, 48)) -> np.ndarray:
+    """Downsampled grayscale copy used for all comparisons"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+def mean_abs_diff(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+def histogram_distance(a: np.ndarray, b: np.ndarray, bins: int = 32) -> float:
+    """Total-variation distance between normalised intensity histograms, in [0, 1]"""
+    shift = 8 - int(np.log2(bins))
+    ha = np.bincount((a >> shift).ravel(), minlength=bins) / a.size
+    hb = np.bincount((b >> shift).ravel(), minlength=bins) / b.size
+    return float(np.abs(ha - hb).sum() / 2)
+
+class SceneChangeDetector:
+    """Tracks the frame the last analysis was run on and reports when the view has moved on.
+
+    Mean absolute difference catches motion and framing changes; the
+    histogram distance catches lighting changes that MAD alone smooths over.
+    """
+
+    def __init__(self, mad_threshold: float = None, hist_threshold: float = None):
+        self.mad_threshold = mad_threshold if mad_threshold is not None else SCENE_MAD_THRESHOLD
+        self.hist_threshold = hist_threshold if hist_threshold is not None else SCENE_HIST_THRESHOLD
+        self._reference: Optional[np.ndarray] = None
+        self.last_analysis: Any = None
+        self.analyses = 0
+        self.skipped_inferences = 0
+
+    def has_changed(self, frame: np.ndarray) -> bool:
+        """True if `frame` differs enough from the last analysed frame to re-run the models"""
+        if self._reference is None or self.last_analysis is None:
+            return True
+
+        thumb = thumbnail(frame)
+        return (mean_abs_diff(thumb, self._reference) > self.mad_threshold
+                or histogram_distance(thumb, self._reference) > self.hist_threshold)
+
+    def reuse(self) -> Any:
+        """Return the previous analysis and count the skipped inference"""
+        self.skipped_inferences += 1
+        return self.last_analysis
+
+    def mark_analyzed(self, frame: np.ndarray, analysis: Any):
+        self._reference = thumbnail(frame)
+        self.last_analysis = analysis
+        self.analyses += 1
+
+    def reset(self):
+        self._reference = None
+        self.last_analysis = None
+
+    def get_stats(self) -> dict:
+        return {"analyses": self.analyses, "skipped_inferences": self.skipped_inferences}
@@ -0,0 +1,216 @@
+# VAD-segmented streaming speech recognition
+# app/streaming_asr.py
+
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))        # speech must be this far above the noise floor
+VAD_MIN_DBFS = float(os.getenv("VAD_MIN_DBFS", "-50"))         # and never quieter than this
+VAD_SEGMENT_PAUSE_MS = int(os.getenv("VAD_SEGMENT_PAUSE_MS", "300"))  # short pause: transcribe what we have
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "800"))      # long pause: the utterance is over
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))
+VAD_CALIBRATION_MS = int(os.getenv("VAD_CALIBRATION_MS", "300"))     # opening audio that seeds the noise floor
+VAD_FLOOR_WINDOW_MS = int(os.getenv("VAD_FLOOR_WINDOW_MS", "5000"))   # history the floor is tracked over
+VAD_FLOOR_PERCENTILE = float(os.getenv("VAD_FLOOR_PERCENTILE", "10"))
+VAD_START_TIMEOUT_S = float(os.getenv("VAD_START_TIMEOUT_S", "8"))   # give up if nobody speaks
+MAX_UTTERANCE_S = float(os.getenv("MAX_UTTERANCE_S", "60"))
+MAX_SEGMENT_S = 25  # stay inside Whisper's 30 s window
+
+def _to_float32(chunk) -> np.ndarray:
+    if isinstance(chunk, (bytes, bytearray, memoryview)):
+        return np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+    chunk = np.asarray(chunk).reshape(-1)
+    if chunk.dtype == np.int16:
+        return chunk.astype(np.float32) / 32768.0
+    return chunk.astype(np.float32, copy=False)
+
+class EnergyVAD:
+    """Frame-level voice activity from RMS level against an adaptive noise floor.
+
+    The floor is seeded from the first VAD_CALIBRATION_MS of audio (treated
+    as non-speech) and then tracked as a low percentile of the levels over
+    the last VAD_FLOOR_WINDOW_MS - speech included - so steady background
+    noise such as a fan or traffic raises the bar instead of reading as
+    one endless utterance.
+    """
+
+    def __init__(self, margin_db: float = None, min_dbfs: float = None):
+        self.margin_db = margin_db if margin_db is not None else VAD_MARGIN_DB
+        self.min_dbfs = min_dbfs if min_dbfs is not None else VAD_MIN_DBFS
+        self._levels = deque(maxlen=max(1, VAD_FLOOR_WINDOW_MS // VAD_FRAME_MS))
+        self._calibration_frames = max(1, VAD_CALIBRATION_MS // VAD_FRAME_MS)
+        self.noise_floor_db = None
+
+    @property
+    def calibrated(self) -> bool:
+        return len(self._levels) >= self._calibration_frames
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        level_db = float(20 * np.log10(np.sqrt(np.mean(frame ** 2)) + 1e-10))
+        self._levels.append(level_db)
+        if not self.calibrated:
+            self.noise_floor_db = float(np.median(self._levels))
+            return False
+
+        # Minimum tracking: pauses between words keep the low percentile at
+        # the background level, while a noise source that never stops lifts it
+        self.noise_floor_db = float(np.percentile(self._levels, VAD_FLOOR_PERCENTILE))
+        return level_db > max(self.min_dbfs, self.noise_floor_db + self.margin_db)
+
+def _whisper_transcribe(audio: np.ndarray) -> str:
+    from app.web_audio_utils import web_audio_processor
+    return web_audio_processor.transcribe_array(audio)
+
+class StreamingASR:
+    """Turns a live PCM stream into utterance transcripts.
+
+    feed() takes audio of any chunk size and runs VAD on 30 ms frames.
+    Within an utterance, every short pause closes a segment that is
+    transcribed in the background while the user keeps talking, and
+    on_partial receives the text so far. A longer trailing silence ends the
+    utterance; feed() then returns the full transcript. Only the last
+    segment is still being transcribed at that point.
+    """
+
+    def __init__(self, transcribe_fn: Callable[[np.ndarray], str] = None, sample_rate: int = 16000,
+                 on_partial: Callable[[str], None] = None, vad: EnergyVAD = None,
+                 segment_pause_ms: int = None, end_silence_ms: int = None):
+        self.transcribe_fn = transcribe_fn or _whisper_transcribe
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.vad = vad or EnergyVAD()
+        self.frame_samples = sample_rate * VAD_FRAME_MS // 1000
+        self.segment_pause_frames = (segment_pause_ms or VAD_SEGMENT_PAUSE_MS) // VAD_FRAME_MS
+        self.end_silence_frames = (end_silence_ms or VAD_END_SILENCE_MS) // VAD_FRAME_MS
+        self.min_speech_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+        # One transcription at a time keeps segments in order and off the capture thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="streaming-asr")
+        self.stats = {"utterances": 0, "segments": 0, "audio_s": 0.0, "final_latency_ms": deque(maxlen=100)}
+        self.reset()
+
+    def reset(self):
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._reset_utterance()
+
+    def _reset_utterance(self):
+        self._segment: List[np.ndarray] = []
+        self._segment_speech_frames = 0
+        self._silent_frames = 0
+        self._utterance_frames = 0
+        self._in_speech = False
+        self._segment_futures = []
+        self._texts: List[str] = []
+
+    @property
+    def in_utterance(self) -> bool:
+        return self._in_speech or bool(self._segment_futures)
+
+    def feed(self, chunk) -> Optional[str]:
+        """Add audio; returns the utterance transcript when one has just ended"""
+        self._pending = np.concatenate([self._pending, _to_float32(chunk)])
+        final = None
+        while len(self._pending) >= self.frame_samples:
+            frame, self._pending = self._pending[:self.frame_samples], self._pending[self.frame_samples:]
+            result = self._process_frame(frame)
+            if result is not None:
+                final = result
+        return final
+
+    def _process_frame(self, frame: np.ndarray) -> Optional[str]:
+        speech = self.vad.is_speech(frame)
+        if not self._in_speech:
+            if not speech:
+                return None
+            self._in_speech = True
+            self._silent_frames = 0
+
+        self._segment.append(frame)
+        self._utterance_frames += 1
+        if speech:
+            self._segment_speech_frames += 1
+            self._silent_frames = 0
+        else:
+            self._silent_frames += 1
+
+        segment_s = len(self._segment) * VAD_FRAME_MS / 1000
+        if self._silent_frames >= self.end_silence_frames or self._utterance_frames * VAD_FRAME_MS / 1000 >= MAX_UTTERANCE_S:
+            return self._finish_utterance()
+        if self._silent_frames == self.segment_pause_frames or segment_s >= MAX_SEGMENT_S:
+            self._close_segment()
+        return None
+
+    def _close_segment(self):
+        if self._segment_speech_frames >= self.min_speech_frames:
+            audio = np.concatenate(self._segment)
+            self.stats["segments"] += 1
+            self.stats["audio_s"] += len(audio) / self.sample_rate
+            self._segment_futures.append(self._executor.submit(self._transcribe_segment, audio))
+        self._segment = []
+        self._segment_speech_frames = 0
+
+    def _transcribe_segment(self, audio: np.ndarray) -> str:
+        text = self.transcribe_fn(audio).strip()
+        if text:
+            self._texts.append(text)
+            if self.on_partial:
+                self.on_partial(" ".join(self._texts))
+        return text
+
+    def _finish_utterance(self) -> Optional[str]:
+        ended_at = time.perf_counter()
+        self._close_segment()
+        for future in self._segment_futures:
+            future.result()
+        text = " ".join(self._texts).strip()
+        self.stats["final_latency_ms"].append((time.perf_counter() - ended_at) * 1000)
+        self.stats["utterances"] += 1
+        self._reset_utterance()
+        return text or None
+
+    def flush(self) -> Optional[str]:
+        """End the current utterance now (e.g. the stream closed)"""
+        if not self.in_utterance:
+            return None
+        return self._finish_utterance()
+
+    def get_stats(self) -> dict:
+        latencies = self.stats["final_latency_ms"]
+        return {
+            "utterances": self.stats["utterances"],
+            "segments": self.stats["segments"],
+            "audio_s": round(self.stats["audio_s"], 1),
+            "avg_final_latency_ms": round(sum(latencies) / len(latencies)) if latencies else None,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+def transcribe_stream(read_chunk: Callable[[], object], sample_rate: int = 16000,
+                      on_partial: Callable[[str], None] = None, start_timeout_s: float = None,
+                      transcribe_fn: Callable[[np.ndarray], str] = None) -> str:
+    """Read audio until one utterance ends and return its transcript
+
+    read_chunk() returns the next block of int16 (bytes or array) or float32
+    samples. Returns "" if nobody starts speaking within start_timeout_s.
+    """
+    start_timeout_s = start_timeout_s if start_timeout_s is not None else VAD_START_TIMEOUT_S
+    asr = StreamingASR(transcribe_fn, sample_rate, on_partial)
+    started = time.monotonic()
+    try:
+        while True:
+            text = asr.feed(read_chunk())
+            if text is not None:
+                return text
+            if not asr.in_utterance and time.monotonic() - started > start_timeout_s:
+                return ""
+    finally:
+        asr.close()
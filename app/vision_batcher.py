@@ -0,0 +1,124 @@
+# Cross-client micro-batching for vision inference
+# app/vision_batcher.py
+
+import os
+import time
+import asyncio
+import logging
+import functools
+from typing import Any, Callable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class VisionBatcher:
+    """Gathers frames from all sessions and captions them in batches.
+
+    Callers await submit(frame); a single collector task waits for the first
+    pending frame, then keeps pulling until either max_batch_size frames are
+    queued or max_wait_ms has passed, and runs one batched inference call.
+    """
+
+    def __init__(self, batch_fn: Optional[Callable[[List[Any]], List[Any]]] = None,
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.max_batch_size = max_batch_size or int(os.getenv("VISION_BATCH_MAX_SIZE", "8"))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("VISION_BATCH_MAX_WAIT_MS", "20"))
+        self._batch_fn = batch_fn
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # One inference thread: batches are already the unit of parallelism
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision-batch")
+        self.stats = {"batches": 0, "frames": 0, "max_batch_seen": 0}
+
+    def _get_batch_fn(self):
+        if self._batch_fn is None:
+            from app.vision_utils import analyze_frames
+            self._batch_fn = analyze_frames
+        return self._batch_fn
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_event_loop().create_task(self._run())
+
+    async def submit(self, frame, **options) -> Any:
+        """Queue a frame for the next batch and wait for its result.
+
+        Keyword options (e.g. max_new_tokens) are passed to the batch
+        function; frames with different options run as separate sub-batches.
+        """
+        self._ensure_started()
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((frame, options, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, dict, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            groups = {}
+            for frame, options, future in await self._collect():
+                groups.setdefault(tuple(sorted(options.items())), []).append((frame, future))
+
+            for options, batch in groups.items():
+                frames = [frame for frame, _ in batch]
+                batch_fn = functools.partial(self._get_batch_fn(), frames, **dict(options))
+
+                try:
+                    results = await loop.run_in_executor(self._executor, batch_fn)
+                except Exception as e:
+                    logger.error(f"Batched vision inference failed: {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self.stats["batches"] += 1
+                self.stats["frames"] += len(batch)
+                self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+
+                for (_, future), result in zip(batch, results):
+                    # The caller may have been cancelled while the batch ran
+                    if not future.done():
+                        future.set_result(result)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["avg_batch_size"] = stats["frames"] / stats["batches"] if stats["batches"] else 0
+        return stats
+
+    async def stop(self):
+        """Cancel the collector task and release the inference thread"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=False)
+
+# Global batcher shared by every WebSocket session
+vision_batcher = VisionBatcher()
+
+async def analyze_frame_batched(frame, **options) -> dict:
+    """Async drop-in for analyze_frame that joins the shared batch"""
+    return await vision_batcher.submit(frame, **options)
+
+async def detect_frame_caption_batched(frame) -> str:
+    """Async drop-in for detect_frame_caption that joins the shared batch"""
+    from app.vision_utils import render_scene_text
+    return render_scene_text(await vision_batcher.submit(frame))
@@ -0,0 +1,300 @@
+# Process-pool vision workers with shared-memory frame hand-off
+# app/vision_pool.py
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import itertools
+import multiprocessing as mp
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VISION_WORKERS = int(os.getenv("VISION_WORKERS", "0"))  # 0 = run vision in-process
+VISION_WORKER_THREADS = int(os.getenv("VISION_WORKER_THREADS", "0"))  # 0 = cores / workers
+VISION_POOL_SLOTS = int(os.getenv("VISION_POOL_SLOTS", "0"))  # 0 = 2 per worker
+VISION_POOL_SLOT_BYTES = int(os.getenv("VISION_POOL_SLOT_BYTES", str(1920 * 1080 * 3)))
+# A worker that keeps dying before it is ready is respawned with exponential
+# backoff, and given up on after this many consecutive failures
+VISION_WORKER_MAX_FAILURES = int(os.getenv("VISION_WORKER_MAX_FAILURES", "5"))
+VISION_WORKER_BACKOFF_S = float(os.getenv("VISION_WORKER_BACKOFF_S", "1"))
+VISION_WORKER_BACKOFF_MAX_S = float(os.getenv("VISION_WORKER_BACKOFF_MAX_S", "60"))
+
+class WorkerCrashedError(RuntimeError):
+    pass
+
+def _worker_main(worker_id, shm_name, slot_bytes, torch_threads, tasks, results):
+    """Vision worker process: owns its own YOLO/BLIP and reads frames out of shared memory"""
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    from app.model_registry import model_registry
+    from app import vision_utils
+    # The model executors would otherwise size themselves to the whole host
+    vision_utils.configure_model_threads(torch_threads)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        names = ["blip_onnx", "yolo_onnx"] if vision_utils.VISION_BACKEND == "onnx" else ["blip", "yolo"]
+        model_registry.warm_up(names)
+        if not model_registry.is_ready(names):
+            status = model_registry.status()
+            errors = {name: status.get(name, {}).get("error") for name in names}
+            results.put(("failed", worker_id, None, f"model warm-up failed: {errors}"))
+            return
+        results.put(("ready", worker_id, None, None))
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            job_id, slot, shape, dtype, options = task
+            # Zero-copy view; the parent doesn't reuse the slot until we answer
+            frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=slot * slot_bytes)
+            try:
+                results.put(("result", worker_id, job_id, vision_utils.analyze_frame(frame, **options)))
+            except Exception as e:
+                results.put(("error", worker_id, job_id, str(e)))
+            del frame
+    finally:
+        shm.close()
+
+class _Worker:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.tasks = None
+        self.in_flight: Dict[int, int] = {}  # job_id -> slot
+        self.ready = False
+        self.failures = 0  # consecutive deaths without becoming ready again
+        self.start_error: Optional[str] = None  # reported by this process if warm-up failed
+        self.last_error: Optional[str] = None  # kept until the worker is ready again
+        self.respawn_at: Optional[float] = None
+        self.gave_up = False
+
+class VisionWorkerPool:
+    """Pool of vision processes fed through shared-memory ring slots.
+
+    The event loop copies a frame into a free slot and sends only
+    (job_id, slot, shape, dtype, options) to the least-loaded worker; the result
+    comes back on a shared queue and resolves the caller's asyncio future.
+    A monitor thread fails a dead worker's in-flight jobs and respawns it,
+    backing off exponentially while it keeps dying before it is ready and
+    giving up after VISION_WORKER_MAX_FAILURES (see has_failed()).
+    """
+
+    def __init__(self, num_workers: int = None, torch_threads: int = None,
+                 slots: int = None, slot_bytes: int = None):
+        self.num_workers = num_workers or VISION_WORKERS or 1
+        cpu_count = os.cpu_count() or 1
+        self.torch_threads = torch_threads or VISION_WORKER_THREADS or max(1, cpu_count // self.num_workers)
+        self.slots = slots or VISION_POOL_SLOTS or 2 * self.num_workers
+        self.slot_bytes = slot_bytes or VISION_POOL_SLOT_BYTES
+
+        self._ctx = mp.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._results = None
+        self._workers = []
+        self._free_slots = deque()
+        self._slot_available: Optional[asyncio.Semaphore] = None
+        self._futures: Dict[int, tuple] = {}  # job_id -> (future, slot)
+        self._job_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._listener = None
+        self.stats = {"jobs": 0, "errors": 0, "worker_restarts": 0}
+
+    def start(self):
+        """Create the shared-memory ring and spawn the workers (call from the event loop)"""
+        if self._running:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._results = self._ctx.Queue()
+        self._free_slots = deque(range(self.slots))
+        self._slot_available = asyncio.Semaphore(self.slots)
+        self._workers = [_Worker(i) for i in range(self.num_workers)]
+        for worker in self._workers:
+            self._spawn(worker)
+
+        self._running = True
+        self._listener = threading.Thread(target=self._listen, name="vision-pool-listener", daemon=True)
+        self._listener.start()
+        logger.info(f"Vision pool started: {self.num_workers} workers x {self.torch_threads} torch threads, "
+                    f"{self.slots} slots of {self.slot_bytes // 1024}KiB")
+
+    def _spawn(self, worker: _Worker):
+        worker.tasks = self._ctx.Queue()
+        worker.ready = False
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.worker_id, self._shm.name, self.slot_bytes, self.torch_threads, worker.tasks, self._results),
+            name=f"vision-worker-{worker.worker_id}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def is_ready(self) -> bool:
+        return self._running and all(w.ready for w in self._workers)
+
+    def has_failed(self) -> bool:
+        """True once a worker has been given up on; the pool will not recover by itself"""
+        return any(w.gave_up for w in self._workers)
+
+    async def submit(self, frame: np.ndarray, **options) -> dict:
+        """Analyze a frame in a worker process and return its structured result"""
+        if not self._running:
+            self.start()
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes exceeds pool slot size {self.slot_bytes}")
+
+        await self._slot_available.acquire()
+        slot = self._free_slots.popleft()
+        try:
+            view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+            view[...] = frame
+            del view
+
+            job_id = next(self._job_ids)
+            future = self._loop.create_future()
+            with self._lock:
+                worker = min((w for w in self._workers if w.process.is_alive()),
+                             key=lambda w: len(w.in_flight), default=None)
+                if worker is None:
+                    raise WorkerCrashedError("No live vision workers")
+                self._futures[job_id] = (future, slot)
+                worker.in_flight[job_id] = slot
+            worker.tasks.put((job_id, slot, frame.shape, frame.dtype.str, options))
+        except Exception:
+            self._release_slot(slot)
+            raise
+
+        self.stats["jobs"] += 1
+        return await future
+
+    def _release_slot(self, slot: int):
+        self._free_slots.append(slot)
+        self._slot_available.release()
+
+    def _resolve(self, job_id: int, result=None, error: Exception = None):
+        entry = self._futures.pop(job_id, None)
+        if entry is None:
+            return
+        future, slot = entry
+
+        def _set():
+            # The slot is only reused once the worker has finished with it,
+            # even if the caller stopped waiting
+            self._release_slot(slot)
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        self._loop.call_soon_threadsafe(_set)
+
+    def _listen(self):
+        last_check = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, worker_id, job_id, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            worker = self._workers[worker_id]
+            if kind == "ready":
+                worker.ready = True
+                worker.failures = 0
+                worker.last_error = None
+                logger.info(f"Vision worker {worker_id} ready")
+                continue
+            if kind == "failed":
+                worker.start_error = payload
+                logger.error(f"Vision worker {worker_id} failed to start: {payload}")
+                continue
+
+            with self._lock:
+                worker.in_flight.pop(job_id, None)
+            if kind == "error":
+                self.stats["errors"] += 1
+                self._resolve(job_id, error=RuntimeError(payload))
+            else:
+                self._resolve(job_id, result=payload)
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self._workers:
+            if worker.gave_up or worker.process.is_alive():
+                continue
+
+            if worker.respawn_at is None:
+                # Just found dead: fail its jobs and schedule the respawn
+                with self._lock:
+                    lost = list(worker.in_flight)
+                    worker.in_flight.clear()
+                for job_id in lost:
+                    self._resolve(job_id, error=WorkerCrashedError(f"Vision worker {worker.worker_id} crashed"))
+
+                worker.failures = 1 if worker.ready else worker.failures + 1
+                worker.ready = False
+                worker.last_error = worker.start_error or f"exit code {worker.process.exitcode}"
+                if worker.failures > VISION_WORKER_MAX_FAILURES:
+                    worker.gave_up = True
+                    logger.error(f"Vision worker {worker.worker_id} failed {worker.failures - 1} restarts "
+                                 f"in a row, giving up: {worker.last_error}")
+                    continue
+                delay = min(VISION_WORKER_BACKOFF_MAX_S, VISION_WORKER_BACKOFF_S * 2 ** (worker.failures - 1))
+                worker.respawn_at = now + delay
+                logger.error(f"Vision worker {worker.worker_id} died ({worker.last_error}), restarting in {delay:.0f}s")
+
+            if now >= worker.respawn_at:
+                with self._lock:
+                    self._spawn(worker)
+                worker.respawn_at = None
+                worker.start_error = None
+                self.stats["worker_restarts"] += 1
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "workers": [
+                {"id": w.worker_id, "alive": bool(w.process and w.process.is_alive()),
+                 "ready": w.ready, "in_flight": len(w.in_flight), "failures": w.failures,
+                 "gave_up": w.gave_up, "last_error": w.last_error}
+                for w in self._workers
+            ],
+            "free_slots": len(self._free_slots),
+        }
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        for worker in self._workers:
+            worker.tasks.put(None)
+        deadline = time.monotonic() + 5
+        for worker in self._workers:
+            worker.process.join(timeout=max(0.1, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._shm.close()
+        self._shm.unlink()
+
+# Global pool; only started when VISION_WORKERS > 0
+vision_pool = VisionWorkerPool()
@@ -0,0 +1,142 @@
+# Load-adaptive vision quality tiers
+# app/vision_quality.py
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Ordered best to cheapest. yolo_imgsz is the YOLO letterbox size (640 by
+# default; shrinking the frame alone is undone by the letterbox, and BLIP
+# resizes to 384 whatever it gets). max_dim shrinks the frame before
+# inference, which only pays off when BLIP is skipped: with_caption=False
+# answers from YOLO alone.
+QUALITY_TIERS = [
+    {"name": "full", "max_new_tokens": None, "max_dim": None, "yolo_imgsz": None, "with_caption": True},
+    {"name": "short_caption", "max_new_tokens": 10, "max_dim": None, "yolo_imgsz": None, "with_caption": True},
+    {"name": "small_input", "max_new_tokens": 10, "max_dim": None, "yolo_imgsz": 320, "with_caption": True},
+    {"name": "yolo_only", "max_new_tokens": None, "max_dim": 320, "yolo_imgsz": 320, "with_caption": False},
+]
+
+QUALITY_DEPTH_STEP_DOWN = int(os.getenv("QUALITY_DEPTH_STEP_DOWN", "4"))
+QUALITY_DEPTH_STEP_UP = int(os.getenv("QUALITY_DEPTH_STEP_UP", "1"))
+QUALITY_LATENCY_STEP_DOWN_MS = float(os.getenv("QUALITY_LATENCY_STEP_DOWN_MS", "3000"))
+QUALITY_LATENCY_STEP_UP_MS = float(os.getenv("QUALITY_LATENCY_STEP_UP_MS", "1500"))
+QUALITY_MIN_DWELL_S = float(os.getenv("QUALITY_MIN_DWELL_S", "5"))
+
+class QualityController:
+    """Admission-aware controller that trades caption quality for latency under load.
+
+    Every vision request acquires a tier and releases it with its latency.
+    The controller steps one tier down when the number of requests in flight
+    or the recent p90 latency crosses the step-down limits, and one tier up
+    once both are back under the step-up limits. A minimum dwell time per
+    tier keeps it from oscillating.
+    """
+
+    def __init__(self, tiers=None, depth_step_down: int = None, depth_step_up: int = None,
+                 latency_step_down_ms: float = None, latency_step_up_ms: float = None,
+                 min_dwell_s: float = None, window: int = 20):
+        self.tiers = tiers or QUALITY_TIERS
+        self.depth_step_down = depth_step_down if depth_step_down is not None else QUALITY_DEPTH_STEP_DOWN
+        self.depth_step_up = depth_step_up if depth_step_up is not None else QUALITY_DEPTH_STEP_UP
+        self.latency_step_down_ms = latency_step_down_ms or QUALITY_LATENCY_STEP_DOWN_MS
+        self.latency_step_up_ms = latency_step_up_ms or QUALITY_LATENCY_STEP_UP_MS
+        self.min_dwell_s = min_dwell_s if min_dwell_s is not None else QUALITY_MIN_DWELL_S
+        self.in_flight = 0
+        self._latencies = deque(maxlen=window)
+        self._tier_index = 0
+        self._last_change = 0.0
+        self.served = {tier["name"]: 0 for tier in self.tiers}
+        self.latency_by_tier = {tier["name"]: deque(maxlen=window) for tier in self.tiers}
+
+    @property
+    def tier(self) -> dict:
+        return self.tiers[self._tier_index]
+
+    def _recent_p90(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        return float(np.percentile(np.array(self._latencies), 90))
+
+    def _evaluate(self):
+        now = time.monotonic()
+        if now - self._last_change < self.min_dwell_s:
+            return
+
+        p90 = self._recent_p90()
+        overloaded = self.in_flight > self.depth_step_down or (p90 is not None and p90 > self.latency_step_down_ms)
+        relaxed = self.in_flight <= self.depth_step_up and (p90 is None or p90 < self.latency_step_up_ms)
+
+        if overloaded and self._tier_index < len(self.tiers) - 1:
+            self._change_tier(self._tier_index + 1, now, p90)
+        elif relaxed and not overloaded and self._tier_index > 0:
+            self._change_tier(self._tier_index - 1, now, p90)
+
+    def _change_tier(self, index: int, now: float, p90):
+        logger.info(f"Vision quality {self.tier['name']} -> {self.tiers[index]['name']} "
+                    f"(in flight {self.in_flight}, p90 {p90 and round(p90)}ms)")
+        self._tier_index = index
+        self._last_change = now
+        # Judge the new tier on its own latencies
+        self._latencies.clear()
+
+    def acquire(self) -> dict:
+        """Admit a request and return the tier it should be served at"""
+        self.in_flight += 1
+        self._evaluate()
+        tier = self.tier
+        self.served[tier["name"]] += 1
+        return tier
+
+    def release(self, tier: dict, latency_ms: float):
+        self.in_flight = max(0, self.in_flight - 1)
+        self._latencies.append(latency_ms)
+        self.latency_by_tier[tier["name"]].append(latency_ms)
+        self._evaluate()
+
+    def satisfies(self, result: Optional[dict]) -> bool:
+        """True if a stored result was served at the current tier or better"""
+        names = [tier["name"] for tier in self.tiers]
+        served_at = (result or {}).get("quality_tier", "full")
+        return served_at in names and names.index(served_at) <= self._tier_index
+
+    @staticmethod
+    def prepare_frame(frame: np.ndarray, tier: dict) -> np.ndarray:
+        max_dim = tier.get("max_dim")
+        if not max_dim or max(frame.shape[:2]) <= max_dim:
+            return frame
+        scale = max_dim / max(frame.shape[:2])
+        size = (int(frame.shape[1] * scale), int(frame.shape[0] * scale))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def inference_options(tier: dict) -> dict:
+        options = {}
+        if tier.get("max_new_tokens"):
+            options["max_new_tokens"] = tier["max_new_tokens"]
+        if tier.get("yolo_imgsz"):
+            options["imgsz"] = tier["yolo_imgsz"]
+        if not tier.get("with_caption", True):
+            options["with_caption"] = False
+        return options
+
+    def get_stats(self) -> dict:
+        return {
+            "current_tier": self.tier["name"],
+            "in_flight": self.in_flight,
+            "served": dict(self.served),
+            "avg_latency_ms": {
+                name: round(sum(samples) / len(samples)) if samples else None
+                for name, samples in self.latency_by_tier.items()
+            },
+        }
+
+# Global controller: load is shared across every session in the process
+quality_controller = QualityController()
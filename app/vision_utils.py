@@ -1,24 +1,354 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import cv2
+import numpy as np
 import torch
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from ultralytics import YOLO
+
+from app.model_registry import model_registry
 
 device = 'cuda' if torch.cuda.is_available() else 'cpu'
-processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base").to(device)
-yolo_model = YOLO("yolov8n.pt")
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+YOLO_WEIGHTS = "yolov8n.pt"
 
-def detect_frame_caption(frame):
-    # YOLO
-    yolo_results = yolo_model.predict(frame)[0]
-    objects = list(set([yolo_results.names[int(cls)] for cls in yolo_results.boxes.cls.tolist()]))
+def _load_blip():
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+    blip_model = BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME).to(device)
+    blip_model.eval()
+    return processor, blip_model
+
+def _warm_blip(blip):
+    processor, blip_model = blip
+    inputs = processor(Image.new("RGB", (384, 384)), return_tensors="pt").to(device)
+    with torch.no_grad():
+        blip_model.generate(**inputs, max_new_tokens=5)
+
+def _load_yolo():
+    from ultralytics import YOLO
+    return YOLO(YOLO_WEIGHTS)
+
+def _warm_yolo(yolo_model):
+    yolo_model.predict(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)
+
+model_registry.register("blip", _load_blip, _warm_blip)
+model_registry.register("yolo", _load_yolo, _warm_yolo)
+
+def get_blip():
+    """Return (processor, blip_model), loading them on first use"""
+    return model_registry.get("blip")
+
+def get_yolo():
+    return model_registry.get("yolo")
+
+# "torch" (default) or "onnx" - the int8 ONNX Runtime graphs built by
+# `python -m app.onnx_vision export`
+VISION_BACKEND = os.getenv("VISION_BACKEND", "torch").lower()
+
+def _load_onnx_blip():
+    from app.onnx_vision import OnnxBlipCaptioner
+    return OnnxBlipCaptioner()
+
+def _warm_onnx_blip(captioner):
+    captioner.caption_images([Image.new("RGB", (384, 384))], max_new_tokens=5)
+
+def _load_onnx_yolo():
+    from app.onnx_vision import OnnxYoloDetector
+    return OnnxYoloDetector()
+
+def _warm_onnx_yolo(detector):
+    detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+
+model_registry.register("blip_onnx", _load_onnx_blip, _warm_onnx_blip)
+model_registry.register("yolo_onnx", _load_onnx_yolo, _warm_onnx_yolo)
+
+# Concurrent mode runs YOLO and BLIP side by side, each on its own worker
+# thread. torch's intra-op thread count and the OpenMP/MKL pools behind it
+# are process-wide, so the two models share one pool; YOLO_THREADS and
+# BLIP_THREADS only size it (their sum in concurrent mode, the larger of
+# the two when the models take turns), they do not partition it.
+CONCURRENT_MODELS = os.getenv("VISION_CONCURRENT_MODELS", "false").lower() == "true"
+_cpu_count = os.cpu_count() or 2
+YOLO_THREADS = int(os.getenv("VISION_YOLO_THREADS", str(max(1, _cpu_count // 3))))
+BLIP_THREADS = int(os.getenv("VISION_BLIP_THREADS", str(max(1, _cpu_count - YOLO_THREADS))))
 
-    # BLIP
+_yolo_executor = None
+_blip_executor = None
+
+def _detection(label, confidence, box):
+    # Integers only: DynamoDB's resource API rejects Python floats
+    return {
+        "label": label,
+        "confidence": int(round(confidence * 100)),
+        "box": [int(round(v)) for v in box],
+    }
+
+def _yolo_detections(yolo_results):
+    names = yolo_results.names
+    boxes = yolo_results.boxes
+    return [
+        _detection(names[int(cls)], conf, box)
+        for cls, conf, box in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist())
+    ]
+
+def _build_result(caption, detections, yolo_ms, blip_ms, **extra):
+    objects = {}
+    for detection in detections:
+        objects[detection["label"]] = objects.get(detection["label"], 0) + 1
+    result = {
+        "caption": caption,
+        "objects": objects,
+        "detections": detections,
+        "timings_ms": {"yolo": int(round(yolo_ms)), "blip": int(round(blip_ms))},
+    }
+    result.update(extra)
+    return result
+
+def render_scene_text(result):
+    """Flatten a structured vision result into the text handed to the LLM"""
+    if result is None:
+        return "No video frame available"
+    if "error" in result:
+        return f"Error analyzing video frame: {result['error']}"
+
+    objects = [
+        f"{label} ({count})" if count > 1 else label
+        for label, count in sorted(result["objects"].items(), key=lambda item: -item[1])
+    ]
+    if result.get("caption_only"):
+        return f"{result['caption']}."
+    if not result["caption"]:
+        # YOLO-only result (e.g. served at the lowest quality tier)
+        return f"Detected objects: {', '.join(objects) or 'none'}."
+    return f"{result['caption']}. Detected objects: {', '.join(objects)}."
+
+def _yolo_kwargs(imgsz):
+    # imgsz is the letterbox size; below the 640 default YOLO does proportionally less work
+    return {"imgsz": imgsz} if imgsz else {}
+
+def _run_yolo(frame, backend=None, imgsz=None):
+    start = time.perf_counter()
+    if (backend or VISION_BACKEND) == "onnx":
+        # The exported graph has a fixed input size, so imgsz does not apply
+        detections = [_detection(*d) for d in model_registry.get("yolo_onnx").detect(frame)]
+        return detections, (time.perf_counter() - start) * 1000
+
+    yolo_results = get_yolo().predict(frame, verbose=False, **_yolo_kwargs(imgsz))[0]
+    return _yolo_detections(yolo_results), (time.perf_counter() - start) * 1000
+
+def _generate_kwargs(max_new_tokens):
+    return {"max_new_tokens": max_new_tokens} if max_new_tokens else {}
+
+def _run_blip(frame, backend=None, max_new_tokens=None):
+    start = time.perf_counter()
     image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if (backend or VISION_BACKEND) == "onnx":
+        caption = model_registry.get("blip_onnx").caption_images([image], max_new_tokens)[0]
+        return caption, (time.perf_counter() - start) * 1000
+
+    processor, blip_model = get_blip()
     inputs = processor(image, return_tensors="pt").to(device)
-    out = blip_model.generate(**inputs)
+    with torch.no_grad():
+        out = blip_model.generate(**inputs, **_generate_kwargs(max_new_tokens))
     caption = processor.decode(out[0], skip_special_tokens=True)
+    return caption, (time.perf_counter() - start) * 1000
+
+def _get_model_executors():
+    global _yolo_executor, _blip_executor
+    if _yolo_executor is None:
+        # Both set the same process-wide count, so which initializer runs
+        # last no longer decides what either model gets
+        threads = intra_op_threads()
+        _yolo_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo",
+                                            initializer=torch.set_num_threads, initargs=(threads,))
+        _blip_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blip",
+                                            initializer=torch.set_num_threads, initargs=(threads,))
+    return _yolo_executor, _blip_executor
+
+def intra_op_threads() -> int:
+    """Size of the one torch intra-op pool YOLO and BLIP share"""
+    return YOLO_THREADS + BLIP_THREADS if CONCURRENT_MODELS else max(YOLO_THREADS, BLIP_THREADS)
+
+def configure_model_threads(total: int):
+    """Size the YOLO/BLIP executor threads to `total` cores instead of the whole host.
+
+    Vision worker processes call this with their share of the machine before
+    running any model: YOLO_THREADS/BLIP_THREADS default to fractions of
+    os.cpu_count(), which would oversubscribe the host with N workers.
+    """
+    global YOLO_THREADS, BLIP_THREADS, _yolo_executor, _blip_executor
+    if CONCURRENT_MODELS:
+        YOLO_THREADS = max(1, total // 3)
+        BLIP_THREADS = max(1, total - YOLO_THREADS)
+    else:
+        # The models take turns, so each may use all of it
+        YOLO_THREADS = BLIP_THREADS = max(1, total)
+    if _yolo_executor is not None:
+        _yolo_executor.shutdown(wait=True)
+        _blip_executor.shutdown(wait=True)
+        _yolo_executor = _blip_executor = None
+
+def _on_yolo_thread(fn, *args):
+    # ultralytics predict() is not thread-safe: every in-process YOLO call
+    # (batcher, per-request analysis, object tracker) goes through one thread
+    return _get_model_executors()[0].submit(fn, *args).result()
+
+def detect_objects(frame):
+    """YOLO-only detections for a BGR frame: [{"label", "confidence", "box"}]
+
+    Calls the model on the current thread; run it on the YOLO executor.
+    """
+    detections, _ = _run_yolo(frame)
+    return detections
+
+def analyze_frame(frame, concurrent=None, max_new_tokens=None, with_caption=True, with_objects=True, imgsz=None):
+    """Run YOLO + BLIP on a BGR frame and return a structured result.
+
+    {"caption": str, "objects": {label: count}, "detections": [{"label",
+    "confidence" (percent), "box" [x1, y1, x2, y2]}], "timings_ms": {"yolo", "blip"}}
+
+    max_new_tokens caps the caption length; imgsz sets the YOLO input size;
+    with_caption=False skips BLIP and with_objects=False skips YOLO (the
+    result is then marked caption_only).
+    """
+    concurrent = CONCURRENT_MODELS if concurrent is None else concurrent
+
+    if not with_objects:
+        caption, blip_ms = _run_blip(frame, max_new_tokens=max_new_tokens)
+        return _build_result(caption, [], 0, blip_ms, caption_only=True)
+    if not with_caption:
+        detections, yolo_ms = _on_yolo_thread(_run_yolo, frame, None, imgsz)
+        caption, blip_ms = "", 0
+    elif concurrent:
+        yolo_executor, blip_executor = _get_model_executors()
+        yolo_future = yolo_executor.submit(_run_yolo, frame, None, imgsz)
+        blip_future = blip_executor.submit(_run_blip, frame, None, max_new_tokens)
+        detections, yolo_ms = yolo_future.result()
+        caption, blip_ms = blip_future.result()
+    else:
+        detections, yolo_ms = _on_yolo_thread(_run_yolo, frame, None, imgsz)
+        caption, blip_ms = _run_blip(frame, max_new_tokens=max_new_tokens)
+
+    return _build_result(caption, detections, yolo_ms, blip_ms)
+
+def analyze_frame_streaming(frame, on_partial, max_new_tokens=None, imgsz=None):
+    """analyze_frame, but BLIP caption text is passed to on_partial(text_so_far) as tokens decode.
+
+    YOLO runs on its worker thread meanwhile. The time to the first caption
+    token is reported as timings_ms["blip_first_token"].
+    """
+    start = time.perf_counter()
+    yolo_executor, _ = _get_model_executors()
+    yolo_future = yolo_executor.submit(_run_yolo, frame, None, imgsz)
+
+    if VISION_BACKEND == "onnx":
+        # The ONNX decode loop has no streamer hook; emit the caption in one piece
+        caption, blip_ms = _run_blip(frame, max_new_tokens=max_new_tokens)
+        on_partial(caption)
+        first_token_ms = blip_ms
+    else:
+        from transformers import TextIteratorStreamer
+
+        processor, blip_model = get_blip()
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        inputs = processor(image, return_tensors="pt").to(device)
+        streamer = TextIteratorStreamer(processor.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def _generate():
+            try:
+                with torch.no_grad():
+                    blip_model.generate(**inputs, streamer=streamer, **_generate_kwargs(max_new_tokens))
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=_generate, name="blip-stream", daemon=True)
+        thread.start()
+
+        caption, first_token_ms = "", None
+        for chunk in streamer:
+            if not chunk:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+            caption += chunk
+            on_partial(caption.strip())
+        thread.join()
+        if errors:
+            raise errors[0]
+        caption = caption.strip()
+        blip_ms = (time.perf_counter() - start) * 1000
+
+    detections, yolo_ms = yolo_future.result()
+    result = _build_result(caption, detections, yolo_ms, blip_ms)
+    result["timings_ms"]["blip_first_token"] = int(round(first_token_ms or blip_ms))
+    return result
+
+def detect_frame_caption_timed(frame, concurrent=None):
+    """Caption a frame and return (caption text, per-model timings in ms)"""
+    result = analyze_frame(frame, concurrent)
+    return render_scene_text(result), result["timings_ms"]
+
+def detect_frame_caption(frame):
+    return render_scene_text(analyze_frame(frame))
+
+def _run_yolo_batch(frames, imgsz=None):
+    if VISION_BACKEND == "onnx":
+        # The exported YOLO graph has a static batch of one
+        return [_run_yolo(frame)[0] for frame in frames]
+
+    # YOLO - predict() accepts a list and runs it as a single batch
+    yolo_batch = get_yolo().predict(list(frames), verbose=False, **_yolo_kwargs(imgsz))
+    return [_yolo_detections(r) for r in yolo_batch]
+
+def _run_blip_batch(frames, max_new_tokens=None):
+    images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+    if VISION_BACKEND == "onnx":
+        return model_registry.get("blip_onnx").caption_images(images, max_new_tokens)
+
+    # BLIP - the processor stacks the images into one pixel_values tensor
+    processor, blip_model = get_blip()
+    inputs = processor(images, return_tensors="pt").to(device)
+    with torch.no_grad():
+        out = blip_model.generate(**inputs, **_generate_kwargs(max_new_tokens))
+    return processor.batch_decode(out, skip_special_tokens=True)
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    return fn(*args), (time.perf_counter() - start) * 1000
+
+def analyze_frames(frames, concurrent=None, max_new_tokens=None, with_caption=True, with_objects=True, imgsz=None):
+    """Structured results for a list of BGR frames from one batched YOLO pass and one batched BLIP generate"""
+    if not frames:
+        return []
+    concurrent = CONCURRENT_MODELS if concurrent is None else concurrent
+
+    if not with_objects:
+        captions, blip_ms = _timed(_run_blip_batch, frames, max_new_tokens)
+        return [_build_result(caption, [], 0, blip_ms, batch_size=len(frames), caption_only=True)
+                for caption in captions]
+    if not with_caption:
+        detections_per_frame, yolo_ms = _on_yolo_thread(_timed, _run_yolo_batch, frames, imgsz)
+        captions, blip_ms = [""] * len(frames), 0
+    elif concurrent:
+        yolo_executor, blip_executor = _get_model_executors()
+        yolo_future = yolo_executor.submit(_timed, _run_yolo_batch, frames, imgsz)
+        blip_future = blip_executor.submit(_timed, _run_blip_batch, frames, max_new_tokens)
+        detections_per_frame, yolo_ms = yolo_future.result()
+        captions, blip_ms = blip_future.result()
+    else:
+        detections_per_frame, yolo_ms = _on_yolo_thread(_timed, _run_yolo_batch, frames, imgsz)
+        captions, blip_ms = _timed(_run_blip_batch, frames, max_new_tokens)
+
+    # Timings are for the whole batch, which is the latency each frame saw
+    return [
+        _build_result(caption, detections, yolo_ms, blip_ms, batch_size=len(frames))
+        for caption, detections in zip(captions, detections_per_frame)
+    ]
 
-    full_caption = f"{caption}. Detected objects: {', '.join(objects)}."
-    return full_caption
+def detect_frames_captions(frames, concurrent=None):
+    """Caption text for a list of BGR frames, batched like analyze_frames"""
+    return [render_scene_text(result) for result in analyze_frames(frames, concurrent)]
@@ -0,0 +1,159 @@
+# Per-session memory of past scene analyses for "what did you see earlier" questions
+# app/visual_memory.py
+
+import os
+import re
+import time
+import zlib
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VISUAL_MEMORY_MAX_ENTRIES = int(os.getenv("VISUAL_MEMORY_MAX_ENTRIES", "500"))
+VISUAL_MEMORY_DIM = int(os.getenv("VISUAL_MEMORY_DIM", "256"))
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "on", "in", "at", "to", "is", "are", "was", "were", "and", "or",
+    "with", "there", "it", "this", "that", "i", "you", "my", "me", "what", "did", "do", "does",
+    "see", "saw", "seen", "have", "has", "any", "some", "earlier", "before", "ago", "where",
+    "when", "last", "time", "previously", "remember",
+}
+
+# "before"/"ago" only count in a temporal phrase: "before that", "a minute ago",
+# not the spatial "is there anything before me"
+_TIME_UNIT = r"(seconds?|minutes?|mins?|hours?|days?|moments?|while|bit|second or two)"
+HISTORY_PATTERN = re.compile(
+    r"\b(earlier|previous(ly)?|last time|did you see|have you seen|had you seen|"
+    r"before (that|this|then|now|i|we)|just before|" + _TIME_UNIT + r" (ago|before)|"
+    r"did i (leave|put|drop)|where did|where was|where were|remember|a while back)\b"
+)
+
+def is_history_question(question: str) -> bool:
+    """True for questions about what was seen in the past rather than right now"""
+    return bool(HISTORY_PATTERN.search(question.lower()))
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z]+", text.lower()) if t not in STOP_WORDS and len(t) > 1]
+
+def _stem(token: str) -> str:
+    # "cups" and "cup" should land in the same bucket
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+def hashed_vector(tokens: List[str], dim: int = None) -> np.ndarray:
+    """L2-normalised hashed bag-of-words; crc32 keeps buckets stable across processes"""
+    dim = dim or VISUAL_MEMORY_DIM
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        vector[zlib.crc32(_stem(token).encode()) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _ago(seconds: float) -> str:
+    if seconds < 90:
+        return f"{int(seconds)} seconds ago"
+    if seconds < 5400:
+        return f"{int(round(seconds / 60))} minutes ago"
+    return f"{seconds / 3600:.1f} hours ago"
+
+class VisualMemory:
+    """Bounded in-memory index of one session's scene analyses.
+
+    Each entry keeps its time range, caption and object counts; its hashed
+    bag-of-words vector (caption words plus object labels) sits in a
+    preallocated ring matrix, so a lookup is one matrix-vector product.
+    Consecutive identical scenes extend the last entry instead of adding one.
+    """
+
+    def __init__(self, max_entries: int = None, dim: int = None):
+        self.max_entries = max_entries or VISUAL_MEMORY_MAX_ENTRIES
+        self.dim = dim or VISUAL_MEMORY_DIM
+        self._vectors = np.zeros((self.max_entries, self.dim), dtype=np.float32)
+        self._entries: List[Optional[dict]] = [None] * self.max_entries
+        self._next = 0
+        self._count = 0
+        self._last = None
+        self.stats = {"added": 0, "merged": 0, "evicted": 0, "searches": 0, "search_ms_total": 0.0}
+
+    def add(self, analysis: dict, timestamp: float = None) -> Optional[dict]:
+        """Remember a structured vision result; returns the entry it went into"""
+        if not analysis or "error" in analysis:
+            return None
+        timestamp = timestamp or time.time()
+        caption = analysis.get("caption", "")
+        objects = dict(analysis.get("objects", {}))
+
+        last = self._last
+        if last is not None and last["caption"] == caption and last["objects"] == objects:
+            last["last_seen"] = timestamp
+            self.stats["merged"] += 1
+            return last
+
+        if self._entries[self._next] is not None:
+            self.stats["evicted"] += 1
+        entry = {"first_seen": timestamp, "last_seen": timestamp, "caption": caption, "objects": objects}
+        self._entries[self._next] = entry
+        self._vectors[self._next] = hashed_vector(tokenize(caption) + list(objects), self.dim)
+        self._next = (self._next + 1) % self.max_entries
+        self._count = min(self._count + 1, self.max_entries)
+        self._last = entry
+        self.stats["added"] += 1
+        return entry
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.1) -> List[Tuple[float, dict]]:
+        """Best-matching past scenes for a question, most similar first"""
+        start = time.perf_counter()
+        results = []
+        query_vector = hashed_vector(tokenize(query), self.dim)
+        if self._count and query_vector.any():
+            scores = self._vectors[:self._count] @ query_vector
+            top = np.argsort(scores)[::-1][:k]
+            results = [(float(scores[i]), self._entries[i]) for i in top if scores[i] >= min_score]
+
+        self.stats["searches"] += 1
+        self.stats["search_ms_total"] += (time.perf_counter() - start) * 1000
+        return results
+
+    def recent(self, n: int = 3) -> List[dict]:
+        """The n most recent entries, newest first"""
+        indices = [(self._next - 1 - i) % self.max_entries for i in range(min(n, self._count))]
+        return [self._entries[i] for i in indices]
+
+    def describe(self, question: str, k: int = 3) -> str:
+        """Plain-text recollection for the GPT prompt (matches, else the latest scenes)"""
+        now = time.time()
+        matches = [entry for _, entry in self.search(question, k)]
+        if not matches:
+            matches = self.recent(k)
+        if not matches:
+            return "I have no earlier observations in this session."
+
+        lines = []
+        for entry in sorted(matches, key=lambda e: e["last_seen"]):
+            objects = ", ".join(f"{count} {label}" for label, count in entry["objects"].items())
+            line = f"{_ago(now - entry['last_seen'])}: {entry['caption'] or 'no caption'}"
+            lines.append(line + (f" (objects: {objects})" if objects else ""))
+        return "Earlier observations: " + "; ".join(lines) + "."
+
+    def clear(self):
+        self._vectors[:] = 0
+        self._entries = [None] * self.max_entries
+        self._next = self._count = 0
+        self._last = None
+
+    def memory_bytes(self) -> int:
+        """Rough footprint: the vector matrix plus caption/object text"""
+        text = sum(len(e["caption"]) + sum(len(label) + 8 for label in e["objects"])
+                   for e in self._entries if e is not None)
+        return self._vectors.nbytes + text
+
+    def get_stats(self) -> dict:
+        searches = self.stats["searches"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "search_ms_total"},
+            "entries": self._count,
+            "memory_bytes": self.memory_bytes(),
+            "avg_search_ms": round(self.stats["search_ms_total"] / searches, 3) if searches else None,
+        }
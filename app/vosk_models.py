@@ -0,0 +1,94 @@
+# Loaded-once Vosk models with pooled per-connection recognizers
+# app/vosk_models.py
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from app.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "vosk_model")
+VOSK_MAX_IDLE_RECOGNIZERS = int(os.getenv("VOSK_MAX_IDLE_RECOGNIZERS", "32"))
+
+def _model_name(model_path: str) -> str:
+    return f"vosk:{model_path}"
+
+def get_vosk_model(model_path: str = None):
+    """The process-wide Model for model_path, read from disk on first use only"""
+    model_path = model_path or VOSK_MODEL_PATH
+
+    def _load():
+        from vosk import Model
+        return Model(model_path)
+
+    # register() keeps the first loader, so this is a no-op after the first call
+    model_registry.register(_model_name(model_path), _load)
+    return model_registry.get(_model_name(model_path))
+
+class RecognizerPool:
+    """KaldiRecognizers sharing one Vosk model.
+
+    A recognizer only holds decoder state; the acoustic model and graph are
+    shared. acquire() hands out an idle recognizer (already Reset()) or
+    creates one; release() resets it and keeps up to max_idle for the next
+    connection.
+    """
+
+    def __init__(self, model_path: str = None, sample_rate: int = 16000, max_idle: int = None):
+        self.model_path = model_path or VOSK_MODEL_PATH
+        self.sample_rate = sample_rate
+        self.max_idle = max_idle if max_idle is not None else VOSK_MAX_IDLE_RECOGNIZERS
+        self._idle: List = []
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.stats = {"created": 0, "reused": 0, "discarded": 0, "setup_ms_total": 0.0}
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._lock:
+            recognizer = self._idle.pop() if self._idle else None
+            self.in_use += 1
+        if recognizer is not None:
+            self.stats["reused"] += 1
+        else:
+            from vosk import KaldiRecognizer
+            recognizer = KaldiRecognizer(get_vosk_model(self.model_path), self.sample_rate)
+            self.stats["created"] += 1
+        self.stats["setup_ms_total"] += (time.perf_counter() - start) * 1000
+        return recognizer
+
+    def release(self, recognizer):
+        # Drop any half-decoded utterance so the next connection starts clean
+        recognizer.Reset()
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+            if len(self._idle) < self.max_idle:
+                self._idle.append(recognizer)
+                return
+        self.stats["discarded"] += 1
+
+    def get_stats(self) -> dict:
+        acquired = self.stats["created"] + self.stats["reused"]
+        return {
+            "created": self.stats["created"],
+            "reused": self.stats["reused"],
+            "discarded": self.stats["discarded"],
+            "in_use": self.in_use,
+            "idle": len(self._idle),
+            "avg_setup_ms": round(self.stats["setup_ms_total"] / acquired, 3) if acquired else None,
+        }
+
+_pools: Dict[Tuple[str, int], RecognizerPool] = {}
+_pools_lock = threading.Lock()
+
+def get_recognizer_pool(model_path: str = None, sample_rate: int = 16000) -> RecognizerPool:
+    """Shared pool per (model, sample rate)"""
+    key = (model_path or VOSK_MODEL_PATH, sample_rate)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = RecognizerPool(key[0], sample_rate)
+        return _pools[key]
@@ -1,60 +1,103 @@
 import io
-import wave
-import numpy as np
-import whisper
-from scipy.io import wavfile
-import tempfile
 import os
+import subprocess
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from app.model_registry import model_registry
+
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "base")
+
+def _load_whisper():
+    import whisper
+    return whisper.load_model(WHISPER_MODEL_SIZE)
+
+def _warm_whisper(whisper_model):
+    whisper_model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)
+
+# Shared by WebAudioProcessor and audio_utils so the weights load once per process
+model_registry.register("whisper", _load_whisper, _warm_whisper)
+
+def get_whisper_model():
+    return model_registry.get("whisper")
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Containers libsndfile can read straight from memory
+_SNDFILE_MAGIC = (b"RIFF", b"RF64", b"OggS", b"fLaC", b"FORM")
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """Polyphase resample of a float32 mono signal"""
+    if orig_sr == target_sr:
+        return audio
+    divisor = gcd(orig_sr, target_sr)
+    return resample_poly(audio, target_sr // divisor, orig_sr // divisor).astype(np.float32)
+
+def _ffmpeg_decode(audio_data: bytes) -> np.ndarray:
+    # Last resort for webm/mp4/mp3: ffmpeg through pipes, still no temp file
+    out = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "pipe:1"],
+        input=audio_data, capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+def decode_audio(audio_data: bytes, sample_rate: int = None, pcm_format: str = "float32") -> np.ndarray:
+    """Audio bytes -> float32 mono at 16 kHz, ready for Whisper, without touching disk
+
+    WAV/OGG/FLAC are decoded in memory. Anything else without a known header
+    is treated as raw PCM (pcm_format "float32", as a JS Float32Array, or
+    "int16") at sample_rate; with no sample_rate, unknown containers go
+    through ffmpeg over a pipe.
+    """
+    if audio_data[:4] in _SNDFILE_MAGIC:
+        audio, source_rate = sf.read(io.BytesIO(audio_data), dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+    elif sample_rate:
+        sample_width = 2 if pcm_format == "int16" else 4
+        if len(audio_data) % sample_width:
+            raise ValueError(f"Raw {pcm_format} PCM body is {len(audio_data)} bytes, "
+                             f"not a whole number of {sample_width}-byte samples")
+        if pcm_format == "int16":
+            audio = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+        else:
+            audio = np.frombuffer(audio_data, dtype=np.float32)
+        source_rate = sample_rate
+    else:
+        return _ffmpeg_decode(audio_data)
+    return np.ascontiguousarray(resample(audio, source_rate), dtype=np.float32)
 
 class WebAudioProcessor:
     """Audio processor optimized for web-based real-time processing"""
     
     def __init__(self):
-        self.whisper_model = whisper.load_model("base")
         self.sample_rate = 16000
+    
+    @property
+    def whisper_model(self):
+        return get_whisper_model()
+        
+    def process_audio_blob(self, audio_data: bytes, sample_rate: int = None, pcm_format: str = "float32") -> str:
+        """Process audio blob from web interface
         
-    def process_audio_blob(self, audio_data: bytes) -> str:
-        """Process audio blob from web interface"""
+        WAV bytes, or raw PCM (e.g. a JS Float32Array) at sample_rate, are
+        decoded in memory and handed to Whisper as an array.
+        """
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                tmp_file.write(audio_data)
-                tmp_path = tmp_file.name
-            
-            # Transcribe with Whisper
-            result = self.whisper_model.transcribe(tmp_path)
-            
-            # Cleanup
-            os.unlink(tmp_path)
-            
-            return result["text"].strip()
+            audio = decode_audio(audio_data, sample_rate, pcm_format)
+            return self.transcribe_array(audio)
             
         except Exception as e:
             print(f"Audio processing error: {e}")
             return ""
     
-    def convert_js_audio_to_wav(self, float32_array: bytes, sample_rate: int = 16000) -> bytes:
-        """Convert JavaScript Float32Array audio data to WAV format"""
-        try:
-            # Convert bytes back to float32 array
-            audio_data = np.frombuffer(float32_array, dtype=np.float32)
-            
-            # Convert to int16
-            audio_int16 = (audio_data * 32767).astype(np.int16)
-            
-            # Create WAV in memory
-            buffer = io.BytesIO()
-            with wave.open(buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)  # Mono
-                wav_file.setsampwidth(2)  # 16-bit
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(audio_int16.tobytes())
-            
-            return buffer.getvalue()
-            
-        except Exception as e:
-            print(f"Audio conversion error: {e}")
-            return b""
+    def transcribe_array(self, audio: np.ndarray) -> str:
+        """Transcribe float32 mono 16 kHz samples with the configured ASR backend"""
+        from app.asr_backends import get_asr_backend
+        return get_asr_backend().transcribe(audio)
     
     def detect_speech_activity(self, audio_data: np.ndarray, threshold: float = 0.01) -> bool:
         """Simple voice activity detection"""
@@ -85,6 +128,6 @@ class WebAudioProcessor:
 # Global instance for web app
 web_audio_processor = WebAudioProcessor()
 
-def transcribe_web_audio(audio_data: bytes) -> str:
+def transcribe_web_audio(audio_data: bytes, sample_rate: int = None, pcm_format: str = "float32") -> str:
     """Main function for transcribing audio from web interface"""
-    return web_audio_processor.process_audio_blob(audio_data)
\ No newline at end of file
+    return web_audio_processor.process_audio_blob(audio_data, sample_rate, pcm_format)
\ No newline at end of file
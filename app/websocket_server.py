@@ -14,6 +14,8 @@ import base64
 from datetime import datetime
 import sys
 import traceback
+import cv2
+import numpy as np
 
 # Import your existing utilities
 sys.path.append('/app')
@@ -21,6 +23,8 @@ from app.aws_utils import upload_to_s3, get_from_dynamodb, save_to_dynamodb
 from app.sqs_utils import send_to_sqs
 from app.vision_utils import process_image_with_ai
 from app.tts_utils import text_to_speech_gtts
+from app.scene_change import SceneChangeDetector
+from app.frame_mailbox import FrameMailbox
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +36,9 @@ logger = logging.getLogger(__name__)
 class SeeHearAIWebSocketServer:
     def __init__(self):
         self.connected_clients = set()
+        self.scene_detectors = {}
+        self.frame_mailboxes = {}
+        self.frame_analyzers = {}
         self.aws_region = os.getenv('AWS_REGION', 'us-east-1')
         self.vision_queue_url = os.getenv('VISION_QUEUE_URL', '')
         self.tts_queue_url = os.getenv('TTS_QUEUE_URL', '')
@@ -40,33 +47,69 @@ class SeeHearAIWebSocketServer:
     async def register_client(self, websocket):
         """Register a new WebSocket client"""
         self.connected_clients.add(websocket)
+        self.scene_detectors[websocket] = SceneChangeDetector()
+        self.frame_mailboxes[websocket] = FrameMailbox()
+        self.frame_analyzers[websocket] = asyncio.create_task(self.analyze_frames(websocket))
         logger.info(f"Client connected. Total clients: {len(self.connected_clients)}")
         
     async def unregister_client(self, websocket):
         """Unregister a WebSocket client"""
         self.connected_clients.discard(websocket)
+        detector = self.scene_detectors.pop(websocket, None)
+        if detector:
+            logger.info(f"Scene-change stats for client: {detector.get_stats()}")
+        mailbox = self.frame_mailboxes.pop(websocket, None)
+        if mailbox:
+            mailbox.close()
+            logger.info(f"Frame mailbox stats for client: {mailbox.get_stats()}")
+        analyzer = self.frame_analyzers.pop(websocket, None)
+        if analyzer:
+            analyzer.cancel()
         logger.info(f"Client disconnected. Total clients: {len(self.connected_clients)}")
 
+    async def analyze_frames(self, websocket):
+        """Per-client analyzer: always works on the freshest unprocessed frame"""
+        mailbox = self.frame_mailboxes[websocket]
+        while True:
+            data = await mailbox.get()
+            if data is None:
+                break
+            await self.handle_video_frame(websocket, data)
+
     async def handle_video_frame(self, websocket, data):
         """Process incoming video frame"""
         try:
             # Decode base64 image
             image_data = base64.b64decode(data['image'])
             
-            # Process with AI vision
-            vision_result = await self.process_vision_async(image_data)
+            # Grayscale decode at 1/4 scale is enough for change detection
+            detector = self.scene_detectors.setdefault(websocket, SceneChangeDetector())
+            thumb = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+            changed = thumb is None or detector.has_changed(thumb)
+            
+            if changed:
+                # Process with AI vision
+                vision_result = await self.process_vision_async(image_data)
+                # A failed analysis is not cached, so the next frame retries it
+                if thumb is not None and "error" not in vision_result:
+                    detector.mark_analyzed(thumb, vision_result)
+            else:
+                vision_result = detector.reuse()
             
             # Send response back to client
             response = {
                 'type': 'vision_result',
                 'timestamp': datetime.now().isoformat(),
-                'result': vision_result
+                'result': vision_result,
+                'reused': not changed,
+                'skipped_inferences': detector.skipped_inferences,
+                'frames': self.frame_mailboxes[websocket].get_stats() if websocket in self.frame_mailboxes else None
             }
             
             await websocket.send(json.dumps(response))
             
-            # Queue for background processing if needed
-            if self.vision_queue_url:
+            # Queue for background processing if needed (new analyses only)
+            if changed and self.vision_queue_url and "error" not in vision_result:
                 await send_to_sqs(self.vision_queue_url, vision_result)
                 
         except Exception as e:
@@ -136,7 +179,9 @@ class SeeHearAIWebSocketServer:
             message_type = data.get('type')
             
             if message_type == 'video_frame':
-                await self.handle_video_frame(websocket, data)
+                # Hand off to the client's analyzer; a frame still waiting
+                # there is replaced, so results never lag behind the camera
+                self.frame_mailboxes[websocket].put(data)
             elif message_type == 'audio_request':
                 await self.handle_audio_request(websocket, data)
             elif message_type == 'ping':
@@ -0,0 +1,214 @@
+# Process-wide Whisper service that batches utterances from all sessions
+# app/whisper_service.py
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WHISPER_BATCH_MAX_SIZE = int(os.getenv("WHISPER_BATCH_MAX_SIZE", "8"))
+WHISPER_BATCH_MAX_WAIT_MS = float(os.getenv("WHISPER_BATCH_MAX_WAIT_MS", "50"))
+WHISPER_MAX_PENDING = int(os.getenv("WHISPER_MAX_PENDING", "64"))  # submit() blocks beyond this
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "0"))  # 0 = all cores
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None  # None = detect per utterance
+# Same fallback schedule and thresholds as whisper.transcribe(): a result that
+# looks like a repetition loop or a low-confidence guess is decoded again hotter
+WHISPER_TEMPERATURES = tuple(float(t) for t in os.getenv("WHISPER_TEMPERATURES", "0,0.2,0.4,0.6,0.8,1.0").split(","))
+WHISPER_BEST_OF = int(os.getenv("WHISPER_BEST_OF", "5"))  # samples per item at temperature > 0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30
+
+class WhisperService:
+    """Queues utterances from every session and runs them through Whisper in batches.
+
+    submit() returns a concurrent.futures.Future. A single inference thread
+    takes the first queued utterance, waits up to max_wait_ms for more (up
+    to max_batch_size), pads each to a 30 s log-mel window and encodes and
+    decodes the whole batch in one pass. An utterance that arrives while the
+    service is idle is dispatched at once rather than waiting for company.
+    Whisper's decoder installs KV-cache hooks on the shared model, so
+    batches - not threads - are the unit of parallelism; the thread's torch
+    pool is sized to the available cores. Items whose decode fails the
+    compression-ratio or log-prob checks are re-decoded at the next
+    temperature, as whisper.transcribe does. Utterances longer than one
+    window, and audio file paths, fall back to model.transcribe.
+    """
+
+    def __init__(self, model_fn: Callable = None, max_batch_size: int = None,
+                 max_wait_ms: float = None, max_pending: int = None, num_threads: int = None):
+        self.max_batch_size = max_batch_size or WHISPER_BATCH_MAX_SIZE
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else WHISPER_BATCH_MAX_WAIT_MS
+        self.num_threads = num_threads or WHISPER_THREADS or (os.cpu_count() or 1)
+        self._model_fn = model_fn
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue(maxsize=max_pending or WHISPER_MAX_PENDING)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"batches": 0, "utterances": 0, "long_utterances": 0, "fallback_decodes": 0,
+                      "errors": 0, "max_batch_seen": 0, "audio_s": 0.0, "busy_s": 0.0}
+
+    def _get_model(self):
+        if self._model_fn is None:
+            from app.web_audio_utils import get_whisper_model
+            self._model_fn = get_whisper_model
+        return self._model_fn()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="whisper-service", daemon=True)
+                self._thread.start()
+
+    def submit(self, audio: Union[np.ndarray, str]) -> Future:
+        """Queue float32 16 kHz mono audio (or an audio file path); the future resolves to the transcript text"""
+        self._ensure_started()
+        future = Future()
+        if not isinstance(audio, str):
+            audio = np.asarray(audio, dtype=np.float32)
+        self._queue.put((audio, future))
+        return future
+
+    def transcribe(self, audio: Union[np.ndarray, str]) -> str:
+        return self.submit(audio).result()
+
+    async def transcribe_async(self, audio: Union[np.ndarray, str]) -> str:
+        return await asyncio.wrap_future(self.submit(audio))
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        batch = [self._queue.get()]
+        # Take whatever queued up while the last batch ran
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # Only this thread runs inference, so nothing is in flight here: a
+        # lone utterance goes straight out; waiting only pays off under load
+        if len(batch) == 1:
+            return batch
+
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        import torch
+        torch.set_num_threads(self.num_threads)
+        while True:
+            batch = self._collect()
+            # Callers that gave up don't need a transcript
+            batch = [(audio, future) for audio, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                texts = self._transcribe_batch([audio for audio, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched Whisper transcription failed: {e}")
+                with self._stats_lock:
+                    self.stats["errors"] += 1
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._stats_lock:
+                self.stats["busy_s"] += time.perf_counter() - start
+                self.stats["batches"] += 1
+                self.stats["utterances"] += len(batch)
+                self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+                self.stats["audio_s"] += sum(len(audio) for audio, _ in batch if not isinstance(audio, str)) / SAMPLE_RATE
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def _transcribe_batch(self, audios: List[Union[np.ndarray, str]]) -> List[str]:
+        import torch
+        import whisper
+
+        model = self._get_model()
+        texts = [None] * len(audios)
+        short = []
+        for i, audio in enumerate(audios):
+            if not isinstance(audio, str) and len(audio) <= WINDOW_SECONDS * SAMPLE_RATE:
+                short.append(i)
+            else:
+                with self._stats_lock:
+                    self.stats["long_utterances"] += 1
+                texts[i] = model.transcribe(audio, fp16=False, language=WHISPER_LANGUAGE)["text"].strip()
+
+        if short:
+            # Every item padded to the same 30 s window, so the encoder sees one tensor
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audios[i])), model.dims.n_mels)
+                for i in short
+            ]).to(model.device)
+            for i, result in zip(short, self._decode_with_fallback(model, mels)):
+                texts[i] = result
+        return texts
+
+    def _decode_with_fallback(self, model, mels) -> List[str]:
+        """whisper.decode over the batch, re-decoding only the items that need a hotter temperature"""
+        import torch
+        import whisper
+
+        results = [None] * len(mels)
+        pending = list(range(len(mels)))
+        for n, temperature in enumerate(WHISPER_TEMPERATURES):
+            sampling = {"best_of": WHISPER_BEST_OF} if temperature > 0 else {}
+            options = whisper.DecodingOptions(fp16=False, language=WHISPER_LANGUAGE, without_timestamps=True,
+                                              temperature=temperature, **sampling)
+            with torch.no_grad():
+                decoded = whisper.decode(model, mels[pending], options)
+            if n:
+                with self._stats_lock:
+                    self.stats["fallback_decodes"] += len(pending)
+
+            retry = []
+            for i, result in zip(pending, decoded):
+                results[i] = result
+                if _needs_fallback(result):
+                    retry.append(i)
+            if not retry:
+                break
+            pending = retry
+
+        # whisper.transcribe drops a window it judges silent rather than returning a guess
+        return ["" if _is_silence(result) else result.text.strip() for result in results]
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["avg_batch_size"] = round(stats["utterances"] / stats["batches"], 2) if stats["batches"] else 0
+        stats["pending"] = self._queue.qsize()
+        stats["realtime_factor"] = round(stats["audio_s"] / stats["busy_s"], 1) if stats["busy_s"] else None
+        return stats
+
+def _needs_fallback(result) -> bool:
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+        return False
+    return result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+
+def _is_silence(result) -> bool:
+    return result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+
+# Global service shared by every session in the process
+whisper_service = WhisperService()
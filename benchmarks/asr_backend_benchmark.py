@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+WER parity, latency and memory: openai-whisper fp32 vs faster-whisper int8
+
+The test set is benchmarks/asr_testset/manifest.jsonl (assistant-style
+questions with reference transcripts). Clips live next to it as
+clips/<id>.(wav|mp3); --make-testset synthesises any missing ones with gTTS
+(needs network once). Each backend runs in its own subprocess so peak RSS is
+not shared between them. The whisper backend is timed on the model itself,
+not through WhisperService, so its batching window does not count against
+it. Exits non-zero if the int8 backend's WER is more
+than --max-wer-delta worse than the fp32 one.
+
+Usage: python benchmarks/asr_backend_benchmark.py --make-testset --runs 3
+"""
+
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TESTSET = os.path.join(ROOT, "benchmarks", "asr_testset")
+BACKENDS = ("whisper", "faster_whisper")
+
+def load_manifest():
+    with open(os.path.join(TESTSET, "manifest.jsonl")) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def clip_path(clip_id):
+    for ext in ("wav", "mp3"):
+        path = os.path.join(TESTSET, "clips", f"{clip_id}.{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+def make_testset():
+    from gtts import gTTS
+    os.makedirs(os.path.join(TESTSET, "clips"), exist_ok=True)
+    for item in load_manifest():
+        if clip_path(item["id"]) is None:
+            gTTS(text=item["text"], lang="en").save(os.path.join(TESTSET, "clips", f"{item['id']}.mp3"))
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + deletions + insertions)"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1], len(ref)
+
+def run_backend(backend, runs):
+    os.environ["ASR_BACKEND"] = backend
+    from app.asr_backends import get_asr_backend
+    from app.model_registry import model_registry
+    from app.web_audio_utils import decode_audio
+
+    asr = get_asr_backend(backend)
+    start = time.perf_counter()
+    model_registry.warm_up(asr.model_names)
+    load_s = round(time.perf_counter() - start, 2)
+
+    transcribe = asr.transcribe
+    if backend == "whisper":
+        from app.web_audio_utils import get_whisper_model
+        from app.whisper_service import WHISPER_LANGUAGE
+        model = get_whisper_model()
+        transcribe = lambda audio: model.transcribe(audio, fp16=False, language=WHISPER_LANGUAGE)["text"].strip()
+
+    errors = words = 0
+    latencies, transcripts = [], {}
+    for item in load_manifest():
+        path = clip_path(item["id"])
+        if path is None:
+            continue
+        with open(path, "rb") as f:
+            audio = decode_audio(f.read())
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            text = transcribe(audio)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        e, n = word_errors(item["text"], text)
+        errors, words = errors + e, words + n
+        transcripts[item["id"]] = text
+
+    return {
+        "backend": backend,
+        "clips": len(transcripts),
+        "wer": round(errors / words, 4) if words else None,
+        "load_and_warmup_s": load_s,
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "transcripts": transcripts,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Timed transcriptions per clip")
+    parser.add_argument("--max-wer-delta", type=float, default=0.02)
+    parser.add_argument("--make-testset", action="store_true")
+    parser.add_argument("--backend", choices=BACKENDS, help="run a single backend in this process")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.runs)))
+        return 0
+
+    if args.make_testset:
+        make_testset()
+    if not any(clip_path(item["id"]) for item in load_manifest()):
+        print("No clips in benchmarks/asr_testset/clips - run with --make-testset first")
+        return 1
+
+    results = {}
+    for backend in BACKENDS:
+        out = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--runs", str(args.runs)],
+            capture_output=True, text=True, check=True,
+        )
+        results[backend] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(list(results.values()), indent=2))
+
+    delta = results["faster_whisper"]["wer"] - results["whisper"]["wer"]
+    if delta > args.max_wer_delta:
+        print(f"FAIL: faster_whisper WER is {delta:.3f} above whisper (limit {args.max_wer_delta})")
+        return 1
+    print(f"OK: WER delta {delta:+.3f} within {args.max_wer_delta}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
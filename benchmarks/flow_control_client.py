@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Simulated /ws client that honours flow_control messages
+
+Connects to a running fastapi_server, sends JPEG frames as binary messages
+at whatever rate/size/quality the server asks for, says the hotword halfway
+through, and checks that the server raised the frame rate once the
+conversation started. Run several copies (--clients) to put the server
+under load and watch it back everyone off.
+
+Usage: python benchmarks/flow_control_client.py --url ws://localhost:8000/ws --seconds 30 --clients 4
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+import websockets
+
+def make_jpeg(max_dimension, quality):
+    # 4:3 noise frame so the server's decoder and scene checks do real work
+    width = max_dimension
+    height = max_dimension * 3 // 4
+    frame = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality * 100)])
+    return buffer.tobytes()
+
+async def run_client(client_id, url, seconds, hotword_at):
+    settings = {"target_fps": 1 / 3, "max_dimension": 640, "jpeg_quality": 0.7}
+    updates, sent = [], []
+    start = time.monotonic()
+
+    async with websockets.connect(url, max_size=None) as websocket:
+        async def receive():
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get("type") == "flow_control":
+                    settings.update({k: message[k] for k in settings})
+                    updates.append((round(time.monotonic() - start, 1), dict(settings), message.get("reason")))
+
+        receiver = asyncio.create_task(receive())
+        said_hotword = False
+        try:
+            while time.monotonic() - start < seconds:
+                elapsed = time.monotonic() - start
+                if not said_hotword and elapsed >= hotword_at:
+                    await websocket.send(json.dumps({"type": "speech_result", "text": "hey buddy"}))
+                    said_hotword = True
+
+                frame = make_jpeg(settings["max_dimension"], settings["jpeg_quality"])
+                await websocket.send(frame)
+                sent.append((elapsed, len(frame)))
+                await asyncio.sleep(1.0 / max(settings["target_fps"], 0.01))
+        finally:
+            receiver.cancel()
+
+    def rate(frames, lo, hi):
+        n = sum(1 for t, _ in frames if lo <= t < hi)
+        return n / (hi - lo) if hi > lo else 0.0
+
+    return {
+        "client": client_id,
+        "frames_sent": len(sent),
+        "kbytes_sent": round(sum(size for _, size in sent) / 1024, 1),
+        "fps_before_hotword": round(rate(sent, 0, hotword_at), 2),
+        "fps_after_hotword": round(rate(sent, hotword_at, seconds), 2),
+        "flow_control_updates": updates,
+    }
+
+async def main_async(args):
+    hotword_at = args.seconds / 2
+    results = await asyncio.gather(*(run_client(i, args.url, args.seconds, hotword_at) for i in range(args.clients)))
+    print(json.dumps(results, indent=2))
+
+    failures = [r["client"] for r in results
+                if not r["flow_control_updates"] or r["fps_after_hotword"] <= r["fps_before_hotword"]]
+    if failures:
+        print(f"FAIL: clients {failures} got no flow control or no fps increase after the hotword")
+        return 1
+    print("OK: every client was throttled while idle and sped up after the hotword")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--clients", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+if __name__ == "__main__":
+    main()
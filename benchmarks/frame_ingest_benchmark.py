@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-frame CPU cost of video frame ingestion: eager decode vs lazy EncodedFrame
+
+"eager" is the old update_frame: base64 decode, PIL decode, RGB->BGR, and a
+cv2.imencode to produce the S3 upload. "lazy_base64" and "lazy_binary" keep
+the JPEG bytes and only decode the frames that get analysed (1 in
+--analyze-every, e.g. one per question).
+
+Usage: python benchmarks/frame_ingest_benchmark.py --frames 300 --analyze-every 10
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.frame_utils import EncodedFrame
+
+def load_jpeg(path, width, height, quality):
+    frame = cv2.imread(path) if path else None
+    if frame is None:
+        # No sample image available - a smooth gradient compresses like a real scene
+        x = np.linspace(0, 255, width, dtype=np.uint8)
+        y = np.linspace(0, 255, height, dtype=np.uint8)
+        frame = np.dstack([np.tile(x, (height, 1)), np.tile(y[:, None], (1, width)),
+                           np.full((height, width), 128, dtype=np.uint8)])
+    frame = cv2.resize(frame, (width, height))
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+def ingest_eager(message, analyze):
+    image_data = base64.b64decode(message)
+    image = Image.open(BytesIO(image_data))
+    frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    _, upload = cv2.imencode(".jpg", frame)
+    return frame, upload
+
+def ingest_lazy_base64(message, analyze):
+    encoded = EncodedFrame(base64.b64decode(message))
+    if analyze:
+        encoded.pixels
+    return encoded, encoded.data
+
+def ingest_lazy_binary(message, analyze):
+    encoded = EncodedFrame(message)
+    if analyze:
+        encoded.pixels
+    return encoded, encoded.data
+
+def run(name, ingest, message, frames, analyze_every):
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for i in range(frames):
+        ingest(message, i % analyze_every == 0)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return {
+        "path": name,
+        "frames": frames,
+        "cpu_ms_per_frame": round(cpu / frames * 1000, 3),
+        "wall_ms_per_frame": round(wall / frames * 1000, 3),
+        "message_bytes": len(message),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default="", help="JPEG to replay (default: synthetic frame)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=70, help="Client JPEG quality")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--analyze-every", type=int, default=10)
+    args = parser.parse_args()
+
+    jpeg = load_jpeg(args.image, args.width, args.height, args.quality)
+    b64 = base64.b64encode(jpeg).decode("ascii")
+
+    results = [
+        run("eager", ingest_eager, b64, args.frames, args.analyze_every),
+        run("lazy_base64", ingest_lazy_base64, b64, args.frames, args.analyze_every),
+        run("lazy_binary", ingest_lazy_binary, jpeg, args.frames, args.analyze_every),
+    ]
+    baseline = results[0]["cpu_ms_per_frame"]
+    for result in results:
+        result["speedup"] = round(baseline / result["cpu_ms_per_frame"], 1) if result["cpu_ms_per_frame"] else None
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
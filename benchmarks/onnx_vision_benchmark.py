@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Latency / memory comparison: torch fp32 vs int8 ONNX Runtime vision backends
+
+Each backend runs in its own subprocess so peak RSS is not shared between them.
+Usage: python benchmarks/onnx_vision_benchmark.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(np.array(samples), q)), 1)
+
+def run_backend(backend, image, runs):
+    os.environ["VISION_BACKEND"] = backend
+    from app import vision_utils
+    from app.model_registry import model_registry
+
+    frame = cv2.imread(image)
+    if frame is None:
+        frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    names = ["blip_onnx", "yolo_onnx"] if backend == "onnx" else ["blip", "yolo"]
+    start = time.perf_counter()
+    model_registry.warm_up(names)
+    load_s = round(time.perf_counter() - start, 2)
+
+    yolo_ms, blip_ms = [], []
+    caption = None
+    for _ in range(runs):
+        detections, ms = vision_utils._run_yolo(frame)
+        yolo_ms.append(ms)
+        caption, ms = vision_utils._run_blip(frame)
+        blip_ms.append(ms)
+
+    return {
+        "backend": backend,
+        "load_and_warmup_s": load_s,
+        "yolo_p50_ms": percentile_ms(yolo_ms, 50),
+        "yolo_p95_ms": percentile_ms(yolo_ms, 95),
+        "blip_p50_ms": percentile_ms(blip_ms, 50),
+        "blip_p95_ms": percentile_ms(blip_ms, 95),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "caption": caption,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--image", default=os.path.join(ROOT, "temp.jpg"))
+    parser.add_argument("--backend", choices=["torch", "onnx"], help="run a single backend in this process")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.image, args.runs)))
+        return
+
+    results = []
+    for backend in ("torch", "onnx"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--runs", str(args.runs), "--image", args.image],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Throughput / tail-latency benchmark: one-frame detect_frame_caption vs VisionBatcher
+
+Simulates N concurrent WebSocket sessions that each ask Q questions about a frame.
+Usage: python benchmarks/vision_batching_benchmark.py --clients 16 --questions 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.vision_utils import detect_frame_caption, detect_frames_captions
+from app.vision_batcher import VisionBatcher
+
+def load_frame(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        # No sample image available - fall back to random noise
+        frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    return frame
+
+def summarize(name, latencies, wall_time):
+    latencies = np.array(latencies) * 1000
+    return {
+        "mode": name,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall_time, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+    }
+
+async def run_clients(clients, questions, frame, infer):
+    latencies = []
+
+    async def client():
+        for _ in range(questions):
+            start = time.perf_counter()
+            await infer(frame)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+async def main(args):
+    frame = load_frame(args.image)
+
+    # Warm both paths so model load is not counted
+    detect_frame_caption(frame)
+    detect_frames_captions([frame])
+
+    # Current path: one frame per call, calls serialized on one inference thread
+    executor = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_event_loop()
+
+    async def single(f):
+        return await loop.run_in_executor(executor, detect_frame_caption, f)
+
+    latencies, wall = await run_clients(args.clients, args.questions, frame, single)
+    results = [summarize("single_frame", latencies, wall)]
+
+    batcher = VisionBatcher(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    latencies, wall = await run_clients(args.clients, args.questions, frame, batcher.submit)
+    batched = summarize("batched", latencies, wall)
+    batched.update(batcher.get_stats())
+    results.append(batched)
+    await batcher.stop()
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--questions", type=int, default=4)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=20)
+    parser.add_argument("--image", default="temp.jpg")
+    asyncio.run(main(parser.parse_args()))
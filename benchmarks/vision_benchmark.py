@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Vision benchmark suite for app.vision_utils
+
+Sweeps backends x torch/ORT thread counts (one subprocess each, so model load
+time and peak RSS are clean) and, inside each, input resolutions x batch sizes
+for YOLO, BLIP and the combined analyze_frames path. Peak RSS is also
+measured per model: YOLO alone and BLIP alone each load and run every case
+in a fresh subprocess, next to an imports-only baseline, so the report shows
+what each model costs and not just the combined footprint. Runs offline on
+deterministic synthetic frames plus temp.jpg and writes JSON for run-to-run
+comparison.
+
+Usage:
+  python benchmarks/vision_benchmark.py --backends torch onnx --threads 1 4 \\
+      --resolutions 640x480 1280x720 --batch-sizes 1 4 --runs 10 --output vision_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def synthetic_frames(width, height, count=4, seed=0):
+    """Deterministic test frames: gradient background with a few filled shapes"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        frame = np.stack([(x + y * 0.5 + i * 40) % 256, (y + i * 60) % 256, (x * 0.5 + 128) % 256], axis=-1).astype(np.uint8)
+        for _ in range(3):
+            cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+            radius = int(rng.integers(min(width, height) // 10, min(width, height) // 4))
+            cv2.circle(frame, (cx, cy), radius, tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+        frames.append(frame)
+    return frames
+
+def load_frames(resolution, image_path):
+    width, height = resolution
+    frames = synthetic_frames(width, height)
+    recorded = cv2.imread(image_path) if image_path else None
+    if recorded is not None:
+        frames.append(cv2.resize(recorded, (width, height), interpolation=cv2.INTER_AREA))
+    return frames
+
+def latency_stats(samples_ms, items_per_sample):
+    samples = np.array(samples_ms)
+    return {
+        "runs": len(samples),
+        "throughput_fps": round(items_per_sample * len(samples) / (samples.sum() / 1000), 2),
+        "p50_ms": round(float(np.percentile(samples, 50)), 1),
+        "p95_ms": round(float(np.percentile(samples, 95)), 1),
+        "p99_ms": round(float(np.percentile(samples, 99)), 1),
+    }
+
+def time_calls(fn, batches, runs):
+    samples = []
+    for i in range(runs):
+        batch = batches[i % len(batches)]
+        start = time.perf_counter()
+        fn(batch)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def model_names(backend):
+    return ("yolo_onnx", "blip_onnx") if backend == "onnx" else ("yolo", "blip")
+
+def configure_child(args):
+    os.environ["VISION_BACKEND"] = args.backend
+    os.environ["ONNX_INTRA_OP_THREADS"] = str(args.thread_count)
+    import torch
+    torch.set_num_threads(args.thread_count)
+    # analyze_frames runs the models on the vision_utils executors, not this
+    # thread; size their (shared) pool to the swept count as workers do
+    from app import vision_utils
+    vision_utils.configure_model_threads(args.thread_count)
+
+def run_memory_child(args):
+    """Peak RSS with only one model ("none" = imports only) loaded and run over every case"""
+    configure_child(args)
+    from app import vision_utils
+    from app.model_registry import model_registry
+
+    result = {"backend": args.backend, "model": args.rss_model}
+    if args.rss_model != "none":
+        yolo_name, blip_name = model_names(args.backend)
+        name, batch_fn = {"yolo": (yolo_name, vision_utils._run_yolo_batch),
+                          "blip": (blip_name, vision_utils._run_blip_batch)}[args.rss_model]
+        model_registry.warm_up([name])
+        if model_registry.status()[name]["state"] != "ready":
+            return {**result, "error": model_registry.status()[name]}
+        for resolution in args.resolutions:
+            frames = load_frames(resolution, args.image)
+            for batch_size in args.batch_sizes:
+                batch_fn([frames[j % len(frames)] for j in range(batch_size)])
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def run_child(args):
+    """Benchmark one backend / thread-count combination in this process"""
+    configure_child(args)
+    import torch
+    from app import vision_utils
+    from app.model_registry import model_registry
+
+    yolo_name, blip_name = model_names(args.backend)
+    model_registry.warm_up([yolo_name, blip_name])
+    status = model_registry.status()
+    if status[yolo_name]["state"] != "ready" or status[blip_name]["state"] != "ready":
+        return {"backend": args.backend, "threads": args.thread_count, "error": status}
+
+    cases = []
+    for resolution in args.resolutions:
+        frames = load_frames(resolution, args.image)
+        for batch_size in args.batch_sizes:
+            batches = [[frames[(i + j) % len(frames)] for j in range(batch_size)] for i in range(len(frames))]
+            # One untimed pass per shape so lazy allocations aren't counted
+            vision_utils.analyze_frames(batches[0])
+
+            case = {"resolution": f"{resolution[0]}x{resolution[1]}", "batch_size": batch_size}
+            case["yolo"] = latency_stats(time_calls(vision_utils._run_yolo_batch, batches, args.runs), batch_size)
+            case["blip"] = latency_stats(time_calls(vision_utils._run_blip_batch, batches, args.runs), batch_size)
+            case["combined"] = latency_stats(time_calls(vision_utils.analyze_frames, batches, args.runs), batch_size)
+            cases.append(case)
+
+    return {
+        "backend": args.backend,
+        "threads": args.thread_count,
+        "model_load_s": {
+            "yolo": status[yolo_name]["load_time_s"],
+            "blip": status[blip_name]["load_time_s"],
+            "combined": round(status[yolo_name]["load_time_s"] + status[blip_name]["load_time_s"], 2),
+        },
+        "warmup_s": {"yolo": status[yolo_name]["warmup_time_s"], "blip": status[blip_name]["warmup_time_s"]},
+        "peak_rss_mb": peak_rss_mb(),
+        # What the models actually ran with: the intra-op pool is process-wide,
+        # so YOLO and BLIP share it in concurrent mode rather than splitting it
+        "intra_op_threads": {
+            "concurrent_models": vision_utils.CONCURRENT_MODELS,
+            "yolo_executor": vision_utils._get_model_executors()[0].submit(torch.get_num_threads).result(),
+            "blip_executor": vision_utils._get_model_executors()[1].submit(torch.get_num_threads).result(),
+        },
+        "cases": cases,
+    }
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=["torch", "onnx"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    parser.add_argument("--resolutions", nargs="+", type=parse_resolution, default=[(640, 480), (1280, 720)])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--image", default=os.path.join(ROOT, "temp.jpg"))
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    # Internal: run a single backend/thread combination
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--thread-count", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--rss-model", choices=["none", "yolo", "blip"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_memory_child(args) if args.rss_model else run_child(args)))
+        return
+
+    passthrough = ["--resolutions", *[f"{w}x{h}" for w, h in args.resolutions],
+                   "--batch-sizes", *map(str, args.batch_sizes),
+                   "--runs", str(args.runs), "--image", args.image]
+
+    def child(backend, threads, *extra):
+        out = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--thread-count", str(threads), *passthrough, *extra],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"backend": backend, "threads": threads, "error": out.stderr.strip().splitlines()[-1:]}
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    runs, memory = [], []
+    for backend in args.backends:
+        for threads in args.threads:
+            runs.append(child(backend, threads))
+
+        # Thread count barely moves RSS, so each backend is measured once
+        per_model = {model: child(backend, args.threads[0], "--rss-model", model)
+                     for model in ("none", "yolo", "blip")}
+        entry = {"backend": backend, "threads": args.threads[0],
+                 "imports_only_peak_rss_mb": per_model["none"].get("peak_rss_mb")}
+        for model in ("yolo", "blip"):
+            result = per_model[model]
+            if "error" in result:
+                entry[model] = {"error": result["error"]}
+                continue
+            entry[model] = {"peak_rss_mb": result["peak_rss_mb"]}
+            if entry["imports_only_peak_rss_mb"] is not None:
+                entry[model]["over_imports_mb"] = round(result["peak_rss_mb"] - entry["imports_only_peak_rss_mb"], 1)
+        memory.append(entry)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "runs": runs,
+        "memory": memory,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Lookup latency and memory footprint of VisualMemory over long sessions
+
+Fills the index with synthetic scene analyses (one every --interval seconds
+of simulated time), then times add() and search() at each size.
+
+Usage: python benchmarks/visual_memory_benchmark.py --sizes 100 500 2000 10000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.visual_memory import VisualMemory
+
+LABELS = ["person", "chair", "cup", "laptop", "book", "dog", "car", "bottle", "phone", "door", "keys", "bag"]
+PLACES = ["kitchen table", "desk", "sofa", "street", "doorway", "shelf", "counter", "park bench"]
+QUERIES = [
+    "where did I leave my keys earlier",
+    "did you see a dog before",
+    "was there a laptop on the desk earlier",
+    "what was on the kitchen table before",
+    "have you seen my phone",
+]
+
+def synthetic_analysis(rng):
+    objects = {label: rng.randint(1, 3) for label in rng.sample(LABELS, rng.randint(1, 4))}
+    subject = rng.choice(list(objects))
+    return {
+        "caption": f"a {subject} on the {rng.choice(PLACES)} next to a {rng.choice(LABELS)}",
+        "objects": objects,
+    }
+
+def bench(size, queries, interval, seed):
+    rng = random.Random(seed)
+    analyses = [synthetic_analysis(rng) for _ in range(size)]
+
+    tracemalloc.start()
+    memory = VisualMemory(max_entries=size)
+    start_ts = time.time() - size * interval
+    add_start = time.perf_counter()
+    for i, analysis in enumerate(analyses):
+        memory.add(analysis, start_ts + i * interval)
+    add_ms = (time.perf_counter() - add_start) * 1000 / size
+    traced_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    for i in range(queries):
+        query = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        memory.describe(query)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies = np.array(latencies)
+
+    return {
+        "entries": size,
+        "session_minutes": round(size * interval / 60, 1),
+        "add_ms": round(add_ms, 4),
+        "lookup_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "lookup_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "index_bytes": memory.memory_bytes(),
+        "traced_kib": round(traced_bytes / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=2.0, help="Simulated seconds between analyses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps([bench(size, args.queries, args.interval, args.seed) for size in args.sizes], indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Per-connection cost of Vosk listeners: Model per detector vs shared model + recognizer pool
+
+"per_detector" is the old HotwordDetector (Model(path) + KaldiRecognizer
+each), measured for a few detectors. "shared" opens --listeners recognizers
+from one RecognizerPool, feeds each a chunk of audio, then closes and
+reopens them to time the pooled reset/reuse path. Memory is RSS growth
+read from /proc/self/statm.
+
+Usage: python benchmarks/vosk_listeners_benchmark.py --model vosk_model --listeners 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.vosk_models import RecognizerPool, get_vosk_model
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def audio_chunk(sample_rate, seconds=0.5):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+def bench_per_detector(model_path, sample_rate, count):
+    from vosk import Model, KaldiRecognizer
+    base = rss_mb()
+    keep, setup = [], []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        model = Model(model_path)
+        keep.append((model, KaldiRecognizer(model, sample_rate)))
+        setup.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mode": "per_detector",
+        "listeners": count,
+        "setup_ms_per_listener": round(float(np.mean(setup)), 1),
+        "rss_mb_per_listener": round((rss_mb() - base) / count, 2),
+    }
+
+def bench_shared(model_path, sample_rate, listeners):
+    t0 = time.perf_counter()
+    get_vosk_model(model_path)
+    model_load_ms = (time.perf_counter() - t0) * 1000
+
+    pool = RecognizerPool(model_path, sample_rate, max_idle=listeners)
+    chunk = audio_chunk(sample_rate)
+    base = rss_mb()
+
+    t0 = time.perf_counter()
+    recognizers = [pool.acquire() for _ in range(listeners)]
+    create_ms = (time.perf_counter() - t0) * 1000
+    for recognizer in recognizers:
+        # Decoder state only grows once audio flows through it
+        recognizer.AcceptWaveform(chunk)
+    rss_per_listener = (rss_mb() - base) / listeners
+
+    for recognizer in recognizers:
+        pool.release(recognizer)
+    t0 = time.perf_counter()
+    recognizers = [pool.acquire() for _ in range(listeners)]
+    reuse_ms = (time.perf_counter() - t0) * 1000
+    for recognizer in recognizers:
+        pool.release(recognizer)
+
+    return {
+        "mode": "shared",
+        "listeners": listeners,
+        "model_load_ms": round(model_load_ms, 1),
+        "setup_ms_per_listener": round(create_ms / listeners, 3),
+        "reuse_ms_per_listener": round(reuse_ms / listeners, 3),
+        "rss_mb_per_listener": round(rss_per_listener, 2),
+        "total_rss_mb": round(rss_mb(), 1),
+        "pool": pool.get_stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="vosk_model")
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--listeners", type=int, default=200)
+    parser.add_argument("--per-detector", type=int, default=3, help="Old-style detectors to measure (each loads the model)")
+    args = parser.parse_args()
+
+    results = [bench_shared(args.model, args.sample_rate, args.listeners)]
+    if args.per_detector:
+        results.append(bench_per_detector(args.model, args.sample_rate, args.per_detector))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
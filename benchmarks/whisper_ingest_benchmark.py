@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Audio ingest cost before Whisper: temp file + ffmpeg vs in-memory decode
+
+"tempfile_ffmpeg" is the old process_audio_blob path (NamedTemporaryFile,
+then whisper.load_audio spawning ffmpeg on it). "in_memory" is
+decode_audio(): soundfile on a BytesIO plus a polyphase resample to 16 kHz.
+Both produce the float32 array Whisper consumes; --transcribe also runs the
+model on it so the share of end-to-end latency is visible.
+
+Usage: python benchmarks/whisper_ingest_benchmark.py --seconds 5 --rate 48000 --runs 20
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.web_audio_utils import decode_audio, get_whisper_model
+
+def make_wav(seconds, rate):
+    t = np.arange(int(seconds * rate)) / rate
+    # A warbling tone with some noise, roughly speech-band
+    signal = 0.3 * np.sin(2 * np.pi * (220 + 80 * np.sin(2 * np.pi * 3 * t)) * t)
+    signal += 0.02 * np.random.default_rng(0).standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, signal.astype(np.float32), rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+def decode_tempfile_ffmpeg(wav_bytes):
+    import whisper
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+        tmp_file.write(wav_bytes)
+        tmp_path = tmp_file.name
+    try:
+        return whisper.load_audio(tmp_path)
+    finally:
+        os.unlink(tmp_path)
+
+def decode_in_memory(wav_bytes):
+    return decode_audio(wav_bytes)
+
+def run(name, decode, wav_bytes, runs, transcribe):
+    decode(wav_bytes)  # warm caches / imports
+    wall, cpu, e2e = [], [], []
+    for _ in range(runs):
+        w0, c0 = time.perf_counter(), time.process_time()
+        audio = decode(wav_bytes)
+        wall.append((time.perf_counter() - w0) * 1000)
+        # process_time excludes the ffmpeg child, so its cost only shows in wall time
+        cpu.append((time.process_time() - c0) * 1000)
+        if transcribe:
+            get_whisper_model().transcribe(audio, fp16=False)
+            e2e.append((time.perf_counter() - w0) * 1000)
+
+    result = {
+        "path": name,
+        "decode_wall_p50_ms": round(float(np.percentile(wall, 50)), 2),
+        "decode_wall_p99_ms": round(float(np.percentile(wall, 99)), 2),
+        "decode_cpu_p50_ms": round(float(np.percentile(cpu, 50)), 2),
+        "samples": len(audio),
+    }
+    if e2e:
+        result["end_to_end_p50_ms"] = round(float(np.percentile(e2e, 50)), 1)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rate", type=int, default=48000, help="Sample rate of the incoming WAV")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--transcribe", action="store_true", help="Also run Whisper on the decoded audio")
+    args = parser.parse_args()
+
+    wav_bytes = make_wav(args.seconds, args.rate)
+    results = [
+        run("tempfile_ffmpeg", decode_tempfile_ffmpeg, wav_bytes, args.runs, args.transcribe),
+        run("in_memory", decode_in_memory, wav_bytes, args.runs, args.transcribe),
+    ]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
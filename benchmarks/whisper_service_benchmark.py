@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Throughput / latency of WhisperService vs one-at-a-time transcription
+
+Simulates N concurrent speakers, each submitting --utterances utterances of
+2-6 s audio. "sequential" is the old behaviour (each request thread calls
+model.transcribe, serialised on the shared model); "batched" goes through
+WhisperService.
+
+Usage: python benchmarks/whisper_service_benchmark.py --speakers 1 8 32 --utterances 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.web_audio_utils import get_whisper_model
+from app.whisper_service import WhisperService
+
+SAMPLE_RATE = 16000
+
+def make_utterances(count, seed):
+    rng = np.random.default_rng(seed)
+    utterances = []
+    for _ in range(count):
+        seconds = rng.uniform(2, 6)
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        audio = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 300) * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+        utterances.append((audio + 0.01 * rng.standard_normal(len(t))).astype(np.float32))
+    return utterances
+
+def run(name, transcribe, speakers, utterances_per_speaker, seed):
+    per_speaker = [make_utterances(utterances_per_speaker, seed + s) for s in range(speakers)]
+    latencies = []
+    lock = threading.Lock()
+
+    def speaker(utterances):
+        for audio in utterances:
+            start = time.perf_counter()
+            transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=speakers) as pool:
+        list(pool.map(speaker, per_speaker))
+    wall = time.perf_counter() - wall_start
+
+    audio_s = sum(len(a) for utterances in per_speaker for a in utterances) / SAMPLE_RATE
+    latencies = np.array(latencies) * 1000
+    return {
+        "mode": name,
+        "speakers": speakers,
+        "utterances": len(latencies),
+        "utterances_per_s": round(len(latencies) / wall, 2),
+        "audio_s_per_wall_s": round(audio_s / wall, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50))),
+        "p99_ms": round(float(np.percentile(latencies, 99))),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speakers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--utterances", type=int, default=4, help="Utterances per speaker")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = get_whisper_model()
+    model_lock = threading.Lock()
+
+    def sequential(audio):
+        with model_lock:
+            return model.transcribe(audio, fp16=False)["text"]
+
+    service = WhisperService(model_fn=lambda: model, max_batch_size=args.batch_size, max_wait_ms=args.max_wait_ms)
+
+    results = []
+    for speakers in args.speakers:
+        results.append(run("sequential", sequential, speakers, args.utterances, args.seed))
+        results.append(run("batched", service.transcribe, speakers, args.utterances, args.seed))
+    print(json.dumps({"results": results, "service": service.get_stats()}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -193,6 +193,28 @@ def analyze_interaction_patterns(session_data):
     
     return patterns
 
+def extract_vision_result(event):
+    """Return (caption, {label: count}, timings_ms) for a vision_analysis event.
+
+    New events store the structured result under data['vision']; older
+    events only have the flattened 'analysis' string, which is parsed back.
+    """
+    data = event.get('data', {})
+    vision = data.get('vision')
+    if vision:
+        objects = {label: int(count) for label, count in vision.get('objects', {}).items()}
+        return vision.get('caption', ''), objects, vision.get('timings_ms', {})
+    
+    analysis_text = data.get('analysis', '')
+    caption, objects = analysis_text, {}
+    if 'Detected objects:' in analysis_text:
+        caption, objects_part = analysis_text.split('Detected objects:', 1)
+        for obj in objects_part.split(','):
+            obj = obj.strip().strip('.')
+            if obj:
+                objects[obj] = objects.get(obj, 0) + 1
+    return caption.strip().rstrip('.'), objects, {}
+
 def analyze_vision_data(session_data):
     """Analyze vision analysis results"""
     vision_events = [e for e in session_data if e['event_type'] == 'vision_analysis']
@@ -201,25 +223,24 @@ def analyze_vision_data(session_data):
         'total_vision_analyses': len(vision_events),
         'detected_objects': defaultdict(int),
         'common_scenes': defaultdict(int),
-        'analysis_length_stats': []
+        'analysis_length_stats': [],
+        'model_latency_ms': defaultdict(list)
     }
     
     for event in vision_events:
-        analysis_text = event.get('data', {}).get('analysis', '')
-        insights['analysis_length_stats'].append(len(analysis_text))
+        caption, objects, timings = extract_vision_result(event)
+        insights['analysis_length_stats'].append(len(caption))
         
-        # Extract detected objects
-        if 'Detected objects:' in analysis_text:
-            objects_part = analysis_text.split('Detected objects:')[1]
-            objects = [obj.strip() for obj in objects_part.split(',')]
-            for obj in objects:
-                if obj:
-                    insights['detected_objects'][obj.strip('.')] += 1
+        for obj, count in objects.items():
+            insights['detected_objects'][obj] += count
+        
+        for model, ms in timings.items():
+            insights['model_latency_ms'][model].append(int(ms))
         
         # Categorize scenes
-        if 'mirror' in analysis_text.lower():
+        if 'mirror' in caption.lower():
             insights['common_scenes']['indoor_mirror'] += 1
-        elif 'person' in analysis_text.lower():
+        elif 'person' in objects or 'person' in caption.lower():
             insights['common_scenes']['person_detected'] += 1
     
     # Calculate statistics
@@ -228,6 +249,11 @@ def analyze_vision_data(session_data):
         insights['max_analysis_length'] = max(insights['analysis_length_stats'])
         insights['min_analysis_length'] = min(insights['analysis_length_stats'])
     
+    insights['avg_model_latency_ms'] = {
+        model: round(sum(samples) / len(samples), 1)
+        for model, samples in insights.pop('model_latency_ms').items()
+    }
+    
     return insights
 
 def analyze_multimedia_usage(multimedia_metrics):
@@ -350,8 +376,8 @@ def analyze_ai_accuracy(session_data):
     # Analyze vision accuracy
     objects_detected = 0
     for event in vision_events:
-        analysis = event.get('data', {}).get('analysis', '')
-        if 'Detected objects:' in analysis:
+        _, objects, _ = extract_vision_result(event)
+        if objects:
             objects_detected += 1
     
     if vision_events:
@@ -0,0 +1,28 @@
+import pytest
+
+from app.question_router import CAPTION_ONLY, FULL, MEMORY, NO_VISION, YOLO_ONLY, route_question
+
+@pytest.mark.parametrize("question, route", [
+    # Small talk, including acknowledgements that trail off
+    ("thanks", NO_VISION),
+    ("thanks a lot", NO_VISION),
+    ("thank you so much buddy", NO_VISION),
+    ("ok then", NO_VISION),
+    ("okay cool thanks", NO_VISION),
+    ("hey buddy", NO_VISION),
+    ("ok how many cups are there", YOLO_ONLY),
+    ("thanks, what colour is the car", CAPTION_ONLY),
+    # Temporal "before"/"ago" is about the past; spatial "before" is not
+    ("what did you see before that", MEMORY),
+    ("what was on the table a minute ago", MEMORY),
+    ("where did I leave my keys", MEMORY),
+    ("what did you see earlier", MEMORY),
+    ("is there anything before me", FULL),
+    ("is there a chair before me", YOLO_ONLY),
+    # Single-stage vision routes
+    ("how many people are there", YOLO_ONLY),
+    ("describe the scene", CAPTION_ONLY),
+    ("what is in front of me", FULL),
+])
+def test_route_question(question, route):
+    assert route_question(question) == route
@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.streaming_asr import StreamingASR
+
+SAMPLE_RATE = 16000
+
+def _noise(seconds, rms, rng):
+    return rng.normal(0, rms, int(seconds * SAMPLE_RATE)).astype(np.float32)
+
+def _tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def _feed(asr, audio, chunk_ms=30):
+    chunk = SAMPLE_RATE * chunk_ms // 1000
+    finals = []
+    for start in range(0, len(audio), chunk):
+        text = asr.feed(audio[start:start + chunk])
+        if text is not None:
+            finals.append(text)
+    return finals
+
+def test_utterance_ends_in_noisy_room():
+    # ~-40 dBFS background noise is louder than VAD_MIN_DBFS; it must not count as speech
+    rng = np.random.default_rng(0)
+    audio = np.concatenate([_noise(2, 0.01, rng), _tone(1) + _noise(1, 0.01, rng), _noise(5, 0.01, rng)])
+    asr = StreamingASR(transcribe_fn=lambda segment: "hello")
+    try:
+        assert _feed(asr, audio) == ["hello"]
+        assert not asr.in_utterance
+    finally:
+        asr.close()
+
+def test_steady_noise_alone_is_not_an_utterance():
+    rng = np.random.default_rng(1)
+    calls = []
+    asr = StreamingASR(transcribe_fn=lambda segment: calls.append(segment) or "noise")
+    try:
+        assert _feed(asr, _noise(8, 0.02, rng)) == []
+        assert not asr.in_utterance
+        assert calls == []
+    finally:
+        asr.close()
+
+def test_utterance_ends_in_quiet_room():
+    rng = np.random.default_rng(2)
+    audio = np.concatenate([_noise(0.5, 0.0005, rng), _tone(1.5), _noise(2, 0.0005, rng)])
+    asr = StreamingASR(transcribe_fn=lambda segment: "how many people are there")
+    try:
+        assert _feed(asr, audio) == ["how many people are there"]
+    finally:
+        asr.close()